@@ -0,0 +1,313 @@
+"""Tool-call latency and throughput benchmarks against a simulated cluster.
+
+Drives the real MCP server either in-process (through the registered
+CallToolRequest handler, including input validation) or over stdio (a
+`proxmox-mcp-sim mcp` subprocess) with concurrent call_tool requests, and
+reports per-tool p50/p95/p99 latency, calls per second, response bytes and
+peak RSS. Results are written as JSON so runs can be compared:
+
+    python benchmarks/bench_tools.py --vms 2000 --containers 500 -o before.json
+    python benchmarks/bench_tools.py --vms 2000 --containers 500 -o after.json --compare before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from mcp import types
+
+from proxmox_mcp.simulator import SimulatedCluster, simulate
+
+Call = tuple[str, dict[str, Any]]
+Invoke = Callable[[str, dict[str, Any]], Awaitable[tuple[int, bool]]]
+
+
+def list_heavy(guests: list[dict[str, Any]], nodes: list[str], rng: random.Random) -> list[Call]:
+    node = rng.choice(nodes)
+    return [
+        ("pve_node_list", {}),
+        ("pve_vm_list", {}),
+        ("pve_container_list", {}),
+        ("pve_storage_content", {"node": node, "storage": "local-lvm"}),
+        ("pve_backup_list", {"node": node, "storage": "local"}),
+    ]
+
+
+def status_heavy(guests: list[dict[str, Any]], nodes: list[str], rng: random.Random) -> list[Call]:
+    vm = rng.choice([g for g in guests if g["type"] == "qemu"])
+    ct = rng.choice([g for g in guests if g["type"] == "lxc"] or [vm])
+    return [
+        ("pve_vm_status", {"node": vm["node"], "vmid": vm["vmid"]}),
+        ("pve_vm_config", {"node": vm["node"], "vmid": vm["vmid"]}),
+        ("pve_container_status", {"node": ct["node"], "vmid": ct["vmid"]}),
+        ("pve_node_status", {"node": rng.choice(nodes)}),
+    ]
+
+
+def mixed_mutate(guests: list[dict[str, Any]], nodes: list[str], rng: random.Random) -> list[Call]:
+    vm = rng.choice([g for g in guests if g["type"] == "qemu"])
+    snapname = f"bench-{rng.getrandbits(32):08x}"
+    return [
+        ("pve_vm_status", {"node": vm["node"], "vmid": vm["vmid"]}),
+        ("pve_vm_start", {"node": vm["node"], "vmid": vm["vmid"]}),
+        ("pve_snapshot_create", {"node": vm["node"], "vmid": vm["vmid"], "name": snapname}),
+        ("pve_snapshot_list", {"node": vm["node"], "vmid": vm["vmid"]}),
+        ("pve_snapshot_delete", {"node": vm["node"], "vmid": vm["vmid"], "name": snapname}),
+    ]
+
+
+WORKLOADS = {"list": list_heavy, "status": status_heavy, "mutate": mixed_mutate}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def _reset_peak_rss(pid: int) -> bool:
+    """Reset the kernel's peak RSS counter (Linux >= 4.0)."""
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return None
+
+
+def _child_pids() -> list[int]:
+    me = str(os.getpid())
+    children = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if f.read().rsplit(")", 1)[1].split()[1] == me:
+                        children.append(int(entry))
+            except (OSError, IndexError):
+                continue
+    return children
+
+
+async def run_tool(invoke: Invoke, calls: list[Call], concurrency: int) -> dict[str, Any]:
+    """Run calls with bounded concurrency and collect latency and size samples."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    sizes: list[int] = []
+    errors = 0
+
+    async def one(name, arguments):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            size, is_error = await invoke(name, arguments)
+            latencies.append(time.perf_counter() - start)
+            sizes.append(size)
+            errors += is_error
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(name, args) for name, args in calls))
+    wall = time.perf_counter() - start
+    return {
+        "calls": len(calls),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "calls_per_sec": round(len(calls) / wall, 2),
+        "bytes_mean": round(sum(sizes) / len(sizes)),
+        "bytes_max": max(sizes),
+        "wall_s": round(wall, 4),
+    }
+
+
+def _result_size(result: types.CallToolResult) -> tuple[int, bool]:
+    size = sum(len(c.text.encode()) for c in result.content if isinstance(c, types.TextContent))
+    text = result.content[0].text if result.content else ""
+    return size, bool(result.isError) or text.startswith('{\n  "error"')
+
+
+async def run_workload(
+    args: argparse.Namespace, name: str, pid_for: Callable[[], int], invoke: Invoke
+) -> dict[str, Any]:
+    """Run one workload, one tool at a time so peak RSS can be attributed per tool."""
+    local = SimulatedCluster(**_cluster_kwargs(args))
+    guests = [
+        {"vmid": g["vmid"], "node": g["node"], "type": g["type"]} for g in local.guests.values()
+    ]
+    rng = random.Random(args.seed)
+    by_tool: dict[str, list[Call]] = {}
+    for _ in range(args.calls):
+        for tool, arguments in WORKLOADS[name](guests, local.nodes, rng):
+            by_tool.setdefault(tool, []).append((tool, arguments))
+
+    tools = {}
+    start = time.perf_counter()
+    for tool, calls in by_tool.items():
+        pid = pid_for()
+        reset = _reset_peak_rss(pid)
+        tools[tool] = await run_tool(invoke, calls, args.concurrency)
+        tools[tool]["peak_rss_bytes"] = _peak_rss(pid)
+        tools[tool]["peak_rss_reset"] = reset
+    wall = time.perf_counter() - start
+    total = sum(t["calls"] for t in tools.values())
+    return {"calls": total, "wall_s": round(wall, 3),
+            "calls_per_sec": round(total / wall, 2), "tools": tools}
+
+
+async def run_in_process(args: argparse.Namespace, workload: str) -> dict[str, Any]:
+    from proxmox_mcp.server import server
+
+    handler = server.request_handlers[types.CallToolRequest]
+
+    async def invoke(name, arguments):
+        request = types.CallToolRequest(
+            method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments)
+        )
+        return _result_size((await handler(request)).root)
+
+    with simulate(**_cluster_kwargs(args)):
+        return await run_workload(args, workload, os.getpid, invoke)
+
+
+async def run_stdio(args: argparse.Namespace, workload: str) -> dict[str, Any]:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    cli = ["-m", "proxmox_mcp.simulator", "mcp"]
+    for key, value in _cluster_kwargs(args).items():
+        cli += [f"--{key.replace('_', '-')}", str(value)]
+    params = StdioServerParameters(command=sys.executable, args=cli, env=dict(os.environ))
+    async with (
+        stdio_client(params, errlog=subprocess.DEVNULL) as (read, write),
+        ClientSession(read, write) as session,
+    ):
+        await session.initialize()
+        await session.list_tools()
+        children = _child_pids()
+        server_pid = children[-1] if children else os.getpid()
+
+        async def invoke(name, arguments):
+            return _result_size(await session.call_tool(name, arguments))
+
+        return await run_workload(args, workload, lambda: server_pid, invoke)
+
+
+def _cluster_kwargs(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "nodes": args.nodes,
+        "vms": args.vms,
+        "containers": args.containers,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "failure_rate": args.failure_rate,
+        "seed": args.seed,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Describe per-tool changes in p50/p95 latency and response size."""
+    lines = []
+    for workload, result in current["workloads"].items():
+        before = previous.get("workloads", {}).get(workload, {}).get("tools", {})
+        for tool, stats in result["tools"].items():
+            old = before.get(tool)
+            if not old:
+                continue
+            parts = []
+            for key in ("p50_ms", "p95_ms", "bytes_mean"):
+                if old[key]:
+                    parts.append(f"{key} {old[key]} -> {stats[key]} "
+                                 f"({(stats[key] - old[key]) / old[key] * 100:+.1f}%)")
+            lines.append(f"{workload}/{tool}: " + ", ".join(parts))
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--mode", choices=["inprocess", "stdio"], default="inprocess")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                        help="Workload to run (repeatable, default: all)")
+    parser.add_argument("--calls", type=int, default=200, help="Rounds per workload")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--vms", type=int, default=300)
+    parser.add_argument("--containers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    runner = run_in_process if args.mode == "inprocess" else run_stdio
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": args.mode,
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+            "cluster": _cluster_kwargs(args),
+        },
+        "workloads": {},
+    }
+    for workload in args.workload or sorted(WORKLOADS):
+        results["workloads"][workload] = asyncio.run(runner(args, workload))
+        summary = results["workloads"][workload]
+        print(f"{workload}: {summary['calls']} calls, {summary['calls_per_sec']} calls/s")
+        for tool, stats in summary["tools"].items():
+            print(f"  {tool:24} p50 {stats['p50_ms']:>9.3f}ms  p95 {stats['p95_ms']:>9.3f}ms  "
+                  f"p99 {stats['p99_ms']:>9.3f}ms  {stats['calls_per_sec']:>9.1f}/s  "
+                  f"{stats['bytes_mean']:>9}B  errors {stats['errors']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare(json.load(f), results):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,133 @@
 
 from __future__ import annotations
 
+import contextvars
+import fnmatch
 import os
-from typing import Any
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, TypeVar
 
 from proxmoxer import ProxmoxAPI
 
+from .metrics import metrics
+from .ratelimit import Priority, lower_priority, node_of, scheduler
+from .tracing import record_request, thread_scope
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def max_workers() -> int:
+    """Default worker count for concurrent API sweeps (PROXMOX_MAX_WORKERS)."""
+    return max(1, int(os.environ.get("PROXMOX_MAX_WORKERS", "8")))
+
+
+def _run_at(priority: Priority, fn: Callable[[T], R], item: T) -> R:
+    lower_priority(priority)
+    with thread_scope():
+        return fn(item)
+
+
+def _outcome(item: T, future: Future[R]) -> tuple[T, R | None, Exception | None]:
+    """Return (item, result, error) of a finished future instead of raising."""
+    error = future.exception()
+    if error is None:
+        return item, future.result(), None
+    if not isinstance(error, Exception):
+        raise error
+    return item, None, error
+
+
+def map_concurrent(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int | None = None,
+    priority: Priority = Priority.BULK,
+) -> list[tuple[T, R | None, Exception | None]]:
+    """Call fn for each item in a thread pool.
+
+    Returns (item, result, error) tuples in input order; exceptions are captured
+    per item instead of aborting the whole sweep. Workers run at bulk priority
+    (or lower) so interactive requests are scheduled ahead of them.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(workers or max_workers(), len(items))) as pool:
+        # Each item runs in a copy of the caller's context so API requests made
+        # by workers are attributed to the caller's trace
+        futures = [
+            pool.submit(contextvars.copy_context().run, _run_at, priority, fn, item)
+            for item in items
+        ]
+        return [_outcome(item, future) for item, future in zip(items, futures)]
+
+
+def iter_concurrent(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int | None = None,
+    priority: Priority = Priority.BULK,
+) -> Iterator[tuple[T, R | None, Exception | None]]:
+    """Like map_concurrent, but yield (item, result, error) as each item completes."""
+    items = list(items)
+    if not items:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(workers or max_workers(), len(items))) as pool:
+        futures = {
+            pool.submit(contextvars.copy_context().run, _run_at, priority, fn, item): item
+            for item in items
+        }
+        try:
+            for future in as_completed(futures):
+                yield _outcome(futures[future], future)
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _drain(items: list[T]) -> Iterator[T]:
+    """Yield and release list items so consumed entries can be garbage collected."""
+    items.reverse()
+    while items:
+        yield items.pop()
+
+
+def _instrument(api: ProxmoxAPI) -> ProxmoxAPI:
+    """Record latency, status and size of every HTTP request made through api."""
+    session = api._store["session"]
+    if getattr(session, "instrumented", False):
+        return api
+    send = session.request
+
+    def request(method, url, *args, **kwargs):
+        node = node_of(url)
+        queued = scheduler.acquire(node)
+        start = time.perf_counter()
+        try:
+            response = send(method, url, *args, **kwargs)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            metrics.record_request(method, url, elapsed, 0, type(e).__name__)
+            record_request(method, url, None, 0, start, elapsed, queued)
+            raise
+        finally:
+            scheduler.release(node)
+        elapsed = time.perf_counter() - start
+        size = len(response.content)
+        error = str(response.status_code) if response.status_code >= 400 else None
+        metrics.record_request(method, url, elapsed, size, error)
+        record_request(method, url, response.status_code, size, start, elapsed, queued)
+        return response
+
+    session.request = request
+    session.instrumented = True
+    return api
+
 
 class ProxmoxClient:
     """Wrapper around proxmoxer for Proxmox VE API access."""
@@ -34,14 +156,14 @@ class ProxmoxClient:
             verify_ssl = os.environ.get("PROXMOX_VERIFY_SSL", "false").lower() == "true"
 
             if token_name and token_value:
-                self._api = ProxmoxAPI(
+                self._api = _instrument(ProxmoxAPI(
                     host,
                     port=port,
                     user=user,
                     token_name=token_name,
                     token_value=token_value,
                     verify_ssl=verify_ssl,
-                )
+                ))
             else:
                 raise ValueError(
                     "PROXMOX_TOKEN_NAME and PROXMOX_TOKEN_VALUE environment variables required"
@@ -49,6 +171,15 @@ class ProxmoxClient:
 
         return self._api
 
+    def use_api(self, api: ProxmoxAPI | None) -> ProxmoxAPI | None:
+        """Replace the API connection and return the previous one.
+
+        Passing None makes the next call reconnect from the environment.
+        """
+        previous = self._api
+        self._api = _instrument(api) if api is not None else None
+        return previous
+
     # Node operations
     def list_nodes(self) -> list[dict[str, Any]]:
         """List all nodes in the cluster."""
@@ -58,16 +189,84 @@ class ProxmoxClient:
         """Get detailed status for a node."""
         return self.api.nodes(node).status.get()
 
+    # Cluster operations
+    def list_guests(self, selector: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        """List VMs and containers cluster-wide, filtered by a guest selector.
+
+        Uses a single /cluster/resources call. Supported selector keys: node,
+        type (qemu/lxc), vmids, name (glob pattern), tag and status.
+        """
+        selector = selector or {}
+        vmids = set(selector.get("vmids") or [])
+        guests = []
+        for guest in self.api.cluster.resources.get(type="vm"):
+            if selector.get("node") and guest.get("node") != selector["node"]:
+                continue
+            if selector.get("type") and guest.get("type") != selector["type"]:
+                continue
+            if vmids and guest.get("vmid") not in vmids:
+                continue
+            if selector.get("name") and not fnmatch.fnmatch(
+                guest.get("name", ""), selector["name"]
+            ):
+                continue
+            if selector.get("tag") and selector["tag"] not in guest.get("tags", "").split(";"):
+                continue
+            if selector.get("status") and guest.get("status") != selector["status"]:
+                continue
+            guests.append(guest)
+        return guests
+
+    def locate_guest(self, vmid: int) -> dict[str, Any]:
+        """Find the node and type (qemu/lxc) of a guest by VMID."""
+        guests = self.list_guests({"vmids": [vmid]})
+        if not guests:
+            raise ValueError(f"Guest {vmid} not found")
+        return guests[0]
+
+    def get_guest_config(self, node: str, vmid: int, vm_type: str = "qemu") -> dict[str, Any]:
+        """Get the configuration of a VM or container."""
+        if vm_type == "qemu":
+            return self.get_vm_config(node, vmid)
+        return self.get_container_config(node, vmid)
+
+    # Task operations
+    def get_task_status(self, node: str, upid: str) -> dict[str, Any]:
+        """Get the status of a task."""
+        return self.api.nodes(node).tasks(upid).status.get()
+
+    def wait_for_task(
+        self, node: str, upid: str, timeout: float = 600, interval: float = 2.0
+    ) -> dict[str, Any]:
+        """Poll a task until it stops and return its final status.
+
+        Polling starts at 100ms and backs off to at most interval seconds, so
+        short tasks such as snapshot deletions return promptly.
+        """
+        deadline = time.monotonic() + timeout
+        delay = min(0.1, interval)
+        while True:
+            status = self.get_task_status(node, upid)
+            if status.get("status") == "stopped":
+                return status
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Task {upid} did not finish within {timeout}s")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, interval)
+
     # VM operations
     def list_vms(self, node: str | None = None) -> list[dict[str, Any]]:
         """List all VMs, optionally filtered by node."""
-        vms = []
+        return list(self.iter_vms(node))
+
+    def iter_vms(self, node: str | None = None) -> Iterator[dict[str, Any]]:
+        """Yield VMs node by node; each node's listing is fetched in one request."""
         nodes = [node] if node else [n["node"] for n in self.list_nodes()]
         for n in nodes:
-            for vm in self.api.nodes(n).qemu.get():
+            for vm in _drain(self.api.nodes(n).qemu.get()):
                 vm["node"] = n
-                vms.append(vm)
-        return vms
+                yield vm
 
     def get_vm_status(self, node: str, vmid: int) -> dict[str, Any]:
         """Get detailed status for a VM."""
@@ -108,13 +307,15 @@ class ProxmoxClient:
     # Container operations
     def list_containers(self, node: str | None = None) -> list[dict[str, Any]]:
         """List all LXC containers, optionally filtered by node."""
-        containers = []
+        return list(self.iter_containers(node))
+
+    def iter_containers(self, node: str | None = None) -> Iterator[dict[str, Any]]:
+        """Yield LXC containers node by node."""
         nodes = [node] if node else [n["node"] for n in self.list_nodes()]
         for n in nodes:
-            for ct in self.api.nodes(n).lxc.get():
+            for ct in _drain(self.api.nodes(n).lxc.get()):
                 ct["node"] = n
-                containers.append(ct)
-        return containers
+                yield ct
 
     def get_container_status(self, node: str, vmid: int) -> dict[str, Any]:
         """Get detailed status for a container."""
@@ -151,15 +352,36 @@ class ProxmoxClient:
             return self.api.nodes(node).storage.get()
         return self.api.storage.get()
 
+    def list_cluster_storage(self) -> list[dict[str, Any]]:
+        """List the storage pools of every node with usage (one /cluster/resources call)."""
+        return self.api.cluster.resources.get(type="storage")
+
+    def get_storage_rrddata(
+        self, node: str, storage: str, timeframe: str = "month", cf: str = "AVERAGE"
+    ) -> list[dict[str, Any]]:
+        """Get usage history samples (time, used, total) of a storage pool."""
+        return self.api.nodes(node).storage(storage).rrddata.get(timeframe=timeframe, cf=cf)
+
     def get_storage_content(self, node: str, storage: str) -> list[dict[str, Any]]:
         """Get content of a storage pool."""
         return self.api.nodes(node).storage(storage).content.get()
 
+    def iter_storage_content(
+        self, node: str, storage: str, content: str | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """Yield the volumes of a storage pool (fetched in one request), optionally of one type."""
+        yield from _drain(self.api.nodes(node).storage(storage).content.get(content=content))
+
     # Backup operations
     def list_backups(self, node: str, storage: str) -> list[dict[str, Any]]:
         """List backups in a storage pool."""
-        content = self.get_storage_content(node, storage)
-        return [item for item in content if item.get("content") == "backup"]
+        return list(self.iter_backups(node, storage))
+
+    def iter_backups(self, node: str, storage: str) -> Iterator[dict[str, Any]]:
+        """Yield backups in a storage pool (filtered server-side)."""
+        for item in self.iter_storage_content(node, storage, "backup"):
+            if item.get("content") == "backup":
+                yield item
 
     def create_backup(self, node: str, vmid: int, storage: str, **kwargs) -> str:
         """Create a backup of a VM or container."""
@@ -190,6 +412,36 @@ class ProxmoxClient:
             return self.api.nodes(node).qemu(vmid).snapshot(name).delete()
         return self.api.nodes(node).lxc(vmid).snapshot(name).delete()
 
+    # Guest agent operations
+    def agent_exec(
+        self, node: str, vmid: int, command: list[str], input_data: str | None = None
+    ) -> int:
+        """Start a command in a VM through the guest agent and return its PID."""
+        result = self.api.nodes(node).qemu(vmid).agent("exec").post(
+            command=command, **{"input-data": input_data}
+        )
+        return result["pid"]
+
+    def agent_exec_status(self, node: str, vmid: int, pid: int) -> dict[str, Any]:
+        """Get the status (and output, once exited) of a guest agent command."""
+        return self.api.nodes(node).qemu(vmid).agent("exec-status").get(pid=pid)
+
+    def agent_file_read(self, node: str, vmid: int, file: str) -> dict[str, Any]:
+        """Read a file inside a VM (the agent returns at most 16 MiB)."""
+        return self.api.nodes(node).qemu(vmid).agent("file-read").get(file=file)
+
+    def agent_file_write(
+        self, node: str, vmid: int, file: str, content: str, encode: bool = True
+    ) -> None:
+        """Write a file inside a VM; with encode=False content must already be base64."""
+        self.api.nodes(node).qemu(vmid).agent("file-write").post(
+            file=file, content=content, encode=int(encode)
+        )
+
+    def agent_network_interfaces(self, node: str, vmid: int) -> list[dict[str, Any]]:
+        """List network interfaces and addresses reported by the guest agent."""
+        return self.api.nodes(node).qemu(vmid).agent("network-get-interfaces").get()["result"]
+
     # Network operations
     def list_networks(self, node: str) -> list[dict[str, Any]]:
         """List network interfaces/bridges on a node."""
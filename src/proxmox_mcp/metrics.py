@@ -0,0 +1,249 @@
+"""Latency, error and response size metrics for tool calls and API requests."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import urlsplit
+
+# Histogram upper bounds in seconds (Prometheus "le" buckets)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Path segment following each collection name is an ID, e.g. /nodes/{node}/qemu/{vmid}.
+# Volume IDs may contain slashes (local:iso/x.iso), so {volume} takes the rest of the path.
+PATH_PARAMS = {
+    "nodes": "{node}",
+    "qemu": "{vmid}",
+    "lxc": "{vmid}",
+    "storage": "{storage}",
+    "content": "{volume}",
+    "snapshot": "{snapname}",
+    "tasks": "{upid}",
+    "network": "{iface}",
+}
+
+API_PREFIX = "/api2/json"
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_path(url: str) -> str:
+    """Reduce an API URL to its route template, e.g. /nodes/{node}/qemu/{vmid}/config."""
+    path = urlsplit(url).path
+    if API_PREFIX in path:
+        path = path.split(API_PREFIX, 1)[1]
+    segments = [s for s in path.split("/") if s]
+    normalized = []
+    placeholder = None
+    for segment in segments:
+        if placeholder == "{volume}":
+            normalized.append(placeholder)
+            break
+        if placeholder:
+            normalized.append(placeholder)
+            placeholder = None
+        else:
+            normalized.append(segment)
+            placeholder = PATH_PARAMS.get(segment)
+    return "/" + "/".join(normalized)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= target and count:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (target - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class Series:
+    """Calls, errors, latency and response sizes for one tool or endpoint."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.error_types: Counter[str] = Counter()
+        self.bytes_total = 0
+        self.bytes_max = 0
+
+    def record(self, seconds: float, size: int, error: str | None) -> None:
+        self.latency.observe(seconds)
+        self.bytes_total += size
+        self.bytes_max = max(self.bytes_max, size)
+        if error:
+            self.errors += 1
+            self.error_types[error] += 1
+
+    def summary(self) -> dict[str, Any]:
+        h = self.latency
+        return {
+            "calls": h.count,
+            "errors": self.errors,
+            "mean_ms": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+            "p50_ms": round(h.quantile(0.50) * 1000, 3),
+            "p95_ms": round(h.quantile(0.95) * 1000, 3),
+            "p99_ms": round(h.quantile(0.99) * 1000, 3),
+            "max_ms": round(h.max * 1000, 3),
+            "total_s": round(h.sum, 3),
+            "bytes_mean": round(self.bytes_total / h.count) if h.count else 0,
+            "bytes_max": self.bytes_max,
+            **({"error_types": dict(self.error_types)} if self.error_types else {}),
+        }
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Thread-safe registry of tool and API request series."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.tools: dict[str, Series] = {}
+        self.endpoints: dict[tuple[str, str], Series] = {}
+        self._last_export = 0.0
+
+    def record_tool(self, name: str, seconds: float, size: int, error: str | None = None) -> None:
+        """Record one tool dispatch; error is the exception type name, if any."""
+        with self._lock:
+            self.tools.setdefault(name, Series()).record(seconds, size, error)
+
+    def record_request(
+        self, method: str, url: str, seconds: float, size: int, error: str | None = None
+    ) -> None:
+        """Record one Proxmox API request; error is the HTTP status or exception name."""
+        key = (method.upper(), normalize_path(url))
+        with self._lock:
+            self.endpoints.setdefault(key, Series()).record(seconds, size, error)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.tools.clear()
+            self.endpoints.clear()
+            self.started = time.time()
+
+    def snapshot(self, top: int | None = None) -> dict[str, Any]:
+        """Summaries per tool and per endpoint, slowest (by total time) first."""
+        with self._lock:
+            tools = {name: s.summary() for name, s in self.tools.items()}
+            endpoints = {f"{m} {p}": s.summary() for (m, p), s in self.endpoints.items()}
+
+        def ordered(series):
+            items = sorted(series.items(), key=lambda item: -item[1]["total_s"])
+            return dict(items[:top] if top else items)
+
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "tools": ordered(tools),
+            "endpoints": ordered(endpoints),
+        }
+
+    def render_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            families = (
+                ("proxmox_mcp_tool", "Tool call", [
+                    (f'tool="{_label(name)}"', s) for name, s in sorted(self.tools.items())
+                ]),
+                ("proxmox_mcp_api_request", "Proxmox API request", [
+                    (f'method="{m}",path="{_label(p)}"', s)
+                    for (m, p), s in sorted(self.endpoints.items())
+                ]),
+            )
+            for prefix, help_text, series in families:
+                lines.append(f"# HELP {prefix}_duration_seconds {help_text} latency")
+                lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+                for labels, s in series:
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), s.latency.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="{le}"}} '
+                                     f"{cumulative}")
+                    lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {s.latency.sum}")
+                    lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {s.latency.count}")
+                lines.append(f"# HELP {prefix}_errors_total {help_text} errors")
+                lines.append(f"# TYPE {prefix}_errors_total counter")
+                for labels, s in series:
+                    lines.append(f"{prefix}_errors_total{{{labels}}} {s.errors}")
+                lines.append(f"# HELP {prefix}_response_bytes_total {help_text} response bytes")
+                lines.append(f"# TYPE {prefix}_response_bytes_total counter")
+                for labels, s in series:
+                    lines.append(f"{prefix}_response_bytes_total{{{labels}}} {s.bytes_total}")
+        return "\n".join(lines) + "\n"
+
+    def maybe_export(self) -> None:
+        """Write PROXMOX_MCP_METRICS_FILE if set and the export interval has passed."""
+        path = os.environ.get("PROXMOX_MCP_METRICS_FILE")
+        if not path:
+            return
+        interval = float(os.environ.get("PROXMOX_MCP_METRICS_INTERVAL", "15"))
+        now = time.monotonic()
+        if now - self._last_export < interval:
+            return
+        self._last_export = now
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", path, e)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9108) -> ThreadingHTTPServer:
+        """Serve /metrics in Prometheus format from a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+# Global metrics registry
+metrics = Metrics()
@@ -0,0 +1,240 @@
+"""Rate limiting and priority scheduling of Proxmox API requests.
+
+Every request acquires a slot from the scheduler before it is sent. Limits
+apply cluster-wide (all traffic goes through one pveproxy) and per node (the
+/nodes/{node}/... the request targets), both as requests per second (token
+buckets) and as concurrent requests. Waiting requests are granted in priority
+order: interactive single-guest calls first, then bulk sweeps (map_concurrent
+workers), then background maintenance (snapshot pruning, storage analytics).
+
+Configured from the environment on first use:
+    PROXMOX_RATE_LIMIT / PROXMOX_RATE_BURST            cluster requests/s (0 = unlimited)
+    PROXMOX_MAX_CONCURRENT                             cluster concurrent requests (0 = unlimited)
+    PROXMOX_NODE_RATE_LIMIT / PROXMOX_NODE_RATE_BURST  per-node requests/s
+    PROXMOX_NODE_MAX_CONCURRENT                        per-node concurrent requests
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from itertools import count
+from typing import Any
+
+
+class Priority(IntEnum):
+    """Request priority; lower values are served first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("proxmox_mcp_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+def lower_priority(level: Priority) -> None:
+    """Lower the priority of the current context to at least level."""
+    if level > _priority.get():
+        _priority.set(level)
+
+
+def node_of(url: str) -> str | None:
+    """Return the node a request URL targets, if any."""
+    marker = "/nodes/"
+    index = url.find(marker)
+    if index < 0:
+        return None
+    node = url[index + len(marker):].split("/", 1)[0].split("?", 1)[0]
+    return node or None
+
+
+class TokenBucket:
+    """Token bucket; a rate of 0 means unlimited."""
+
+    def __init__(self, rate: float = 0, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if not self.rate or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        if self.rate:
+            self.tokens -= 1
+
+
+class Limit:
+    """Requests/s and concurrency limit for the cluster or one node."""
+
+    def __init__(self, rate: float = 0, burst: float | None = None, max_concurrent: int = 0):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.granted = 0
+
+    def delay(self) -> float | None:
+        """Seconds until a request may start; None if blocked on concurrency."""
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            return None
+        return self.bucket.delay()
+
+
+class Scheduler:
+    """Grants request slots in priority order under cluster and per-node limits."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = count()
+        self._waiting: list[tuple[int, int, str | None]] = []
+        self._configured = False
+        self.cluster = Limit()
+        self.nodes: dict[str, Limit] = {}
+        self._node_settings: tuple[float, float | None, int] = (0, None, 0)
+        self._stats = {p: {"requests": 0, "waited": 0, "wait_s": 0.0, "max_wait_s": 0.0}
+                       for p in Priority}
+
+    def configure(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        max_concurrent: int | None = None,
+        node_rate: float | None = None,
+        node_burst: float | None = None,
+        node_max_concurrent: int | None = None,
+    ) -> None:
+        """Set limits; arguments left as None are read from the environment."""
+
+        def env(name, default, cast=float):
+            value = os.environ.get(name)
+            return cast(value) if value not in (None, "") else default
+
+        with self._cond:
+            self.cluster = Limit(
+                rate if rate is not None else env("PROXMOX_RATE_LIMIT", 0),
+                burst if burst is not None else env("PROXMOX_RATE_BURST", None),
+                max_concurrent if max_concurrent is not None
+                else env("PROXMOX_MAX_CONCURRENT", 8, int),
+            )
+            self._node_settings = (
+                node_rate if node_rate is not None else env("PROXMOX_NODE_RATE_LIMIT", 0),
+                node_burst if node_burst is not None else env("PROXMOX_NODE_RATE_BURST", None),
+                node_max_concurrent if node_max_concurrent is not None
+                else env("PROXMOX_NODE_MAX_CONCURRENT", 4, int),
+            )
+            self.nodes = {}
+            self._configured = True
+            self._cond.notify_all()
+
+    def _node(self, node: str) -> Limit:
+        limit = self.nodes.get(node)
+        if limit is None:
+            limit = self.nodes[node] = Limit(*self._node_settings)
+        return limit
+
+    def _limits(self, node: str | None) -> list[Limit]:
+        return [self.cluster, self._node(node)] if node else [self.cluster]
+
+    def _delay(self, node: str | None) -> float | None:
+        delays = [limit.delay() for limit in self._limits(node)]
+        if None in delays:
+            return None
+        return max(delays)
+
+    def acquire(self, node: str | None = None, priority: Priority | None = None) -> float:
+        """Block until a request to node may be sent; returns seconds waited."""
+        if not self._configured:
+            self.configure()
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        with self._cond:
+            ticket = (int(priority), next(self._seq), node)
+            self._waiting.append(ticket)
+            self._waiting.sort()
+            while True:
+                now = time.monotonic()
+                self.cluster.bucket.refill(now)
+                for limit in self.nodes.values():
+                    limit.bucket.refill(now)
+                # The first waiter (in priority order) that can start right now goes next
+                first_runnable = next(
+                    (t for t in self._waiting if self._delay(t[2]) == 0), None
+                )
+                if first_runnable == ticket:
+                    break
+                delay = self._delay(node)
+                if first_runnable is not None:
+                    self._cond.notify_all()
+                    self._cond.wait(0.05)
+                else:
+                    self._cond.wait(delay if delay else None)
+            self._waiting.remove(ticket)
+            for limit in self._limits(node):
+                limit.bucket.take()
+                limit.in_flight += 1
+                limit.granted += 1
+            waited = time.monotonic() - start
+            stats = self._stats[Priority(ticket[0])]
+            stats["requests"] += 1
+            if waited > 0.001:
+                stats["waited"] += 1
+            stats["wait_s"] += waited
+            stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+            self._cond.notify_all()
+        return waited
+
+    def release(self, node: str | None = None) -> None:
+        """Return the slot taken by acquire."""
+        with self._cond:
+            for limit in self._limits(node):
+                limit.in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        """Limits, in-flight requests, queue length and wait times per priority."""
+
+        def describe(limit: Limit) -> dict[str, Any]:
+            return {
+                "rate": limit.bucket.rate or None,
+                "max_concurrent": limit.max_concurrent or None,
+                "in_flight": limit.in_flight,
+                "granted": limit.granted,
+            }
+
+        with self._cond:
+            return {
+                "cluster": describe(self.cluster),
+                "nodes": {node: describe(limit) for node, limit in sorted(self.nodes.items())},
+                "queued": len(self._waiting),
+                "priorities": {
+                    p.name.lower(): {
+                        "requests": s["requests"],
+                        "waited": s["waited"],
+                        "mean_wait_ms": round(s["wait_s"] / s["requests"] * 1000, 3)
+                        if s["requests"] else 0.0,
+                        "max_wait_ms": round(s["max_wait_s"] * 1000, 3),
+                    }
+                    for p, s in self._stats.items()
+                },
+            }
+
+
+# Global scheduler shared by all API requests
+scheduler = Scheduler()
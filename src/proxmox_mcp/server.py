@@ -2,6 +2,10 @@
 
 import asyncio
 import json
+import os
+import time
+from collections.abc import Iterator
+from itertools import islice
 from typing import Any
 
 from dotenv import load_dotenv
@@ -10,7 +14,10 @@ from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
 from .client import client
-from .tools import nodes, vms, containers, storage, network, backup
+from .metrics import metrics
+from .tracing import redact_arguments, thread_scope, tracer
+from .tools.common import STREAM_MAX_ITEMS
+from .tools import nodes, vms, containers, storage, network, backup, config, stats, batch, agent
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +31,72 @@ def format_result(data: Any) -> str:
     return json.dumps(data, indent=2, default=str)
 
 
+def _traced(fn, *args):
+    with thread_scope():
+        return fn(*args)
+
+
+async def _offload(fn, *args):
+    """Run a blocking call in a worker thread that counts towards the current trace."""
+    return await asyncio.to_thread(_traced, fn, *args)
+
+
+def _progress_token() -> str | int | None:
+    try:
+        meta = server.request_context.meta
+    except LookupError:
+        return None
+    return meta.progressToken if meta else None
+
+
+async def stream_result(
+    items: Iterator[Any], chunk_size: int = 500, offset: int = 0, max_items: int = STREAM_MAX_ITEMS
+) -> list[TextContent]:
+    """Serialize a listing generator as compact JSON array chunks.
+
+    Items are serialized as they are consumed, so no full result list is built,
+    and iteration stops after max_items. All chunks are returned in one
+    response; a progress notification is sent per chunk when the caller
+    supplied a progress token. The last content block is a summary with
+    next_offset for continuation.
+    """
+    if max_items < 1:
+        raise ValueError("max_items must be at least 1")
+    token = _progress_token()
+    chunk_size = max(1, chunk_size)
+    contents = []
+    emitted = 0
+
+    def take(count: int) -> list[Any]:
+        return list(islice(items, count))
+
+    # Generators make their API requests while being consumed, so they are
+    # advanced in a worker thread, one chunk at a time
+    try:
+        if offset:
+            await _offload(lambda: next(islice(items, offset, offset), None))
+        while emitted < max_items:
+            chunk = await _offload(take, min(chunk_size, max_items - emitted))
+            if not chunk:
+                break
+            contents.append(TextContent(type="text", text=json.dumps(chunk, default=str)))
+            emitted += len(chunk)
+            if token is not None:
+                await server.request_context.session.send_progress_notification(
+                    token, emitted, message=f"{emitted} items"
+                )
+        more = emitted >= max_items and bool(await _offload(take, 1))
+    finally:
+        # Closing runs the generator's cleanup, which may make API requests too
+        if hasattr(items, "close"):
+            await _offload(items.close)
+    summary = {
+        "items": emitted, "offset": offset, "next_offset": offset + emitted if more else None
+    }
+    contents.append(TextContent(type="text", text=json.dumps(summary)))
+    return contents
+
+
 @server.list_tools()
 async def list_tools() -> list[Tool]:
     """List all available Proxmox tools."""
@@ -33,34 +106,77 @@ async def list_tools() -> list[Tool]:
     tools.extend(containers.get_tools())
     tools.extend(storage.get_tools())
     tools.extend(network.get_tools())
+    tools.extend(agent.get_tools())
     tools.extend(backup.get_tools())
+    tools.extend(config.get_tools())
+    tools.extend(batch.get_tools())
+    tools.extend(stats.get_tools())
     return tools
 
 
+def dispatch(name: str, arguments: dict[str, Any]) -> Any:
+    """Route a tool call to its handler module."""
+    if name.startswith("pve_node"):
+        return nodes.handle_tool(name, arguments)
+    elif name.startswith("pve_vm"):
+        return vms.handle_tool(name, arguments)
+    elif name.startswith("pve_container"):
+        return containers.handle_tool(name, arguments)
+    elif name.startswith("pve_storage"):
+        return storage.handle_tool(name, arguments)
+    elif name.startswith("pve_network"):
+        return network.handle_tool(name, arguments)
+    elif name.startswith("pve_agent"):
+        return agent.handle_tool(name, arguments)
+    elif name.startswith("pve_backup") or name.startswith("pve_snapshot"):
+        return backup.handle_tool(name, arguments)
+    elif name.startswith("pve_config"):
+        return config.handle_tool(name, arguments)
+    elif name.startswith("pve_batch"):
+        return batch.handle_tool(name, arguments)
+    elif name.startswith("pve_server"):
+        return stats.handle_tool(name, arguments)
+    raise ValueError(f"Unknown tool: {name}")
+
+
 @server.call_tool()
 async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
     """Execute a Proxmox tool."""
+    trace = tracer.start(name)
+    start = time.perf_counter()
+    error = None
+    # Read up front: handlers may pop from arguments
+    stream_options = {
+        key: arguments[key] for key in ("chunk_size", "offset", "max_items") if key in arguments
+    }
     try:
-        # Route to appropriate handler
-        if name.startswith("pve_node"):
-            result = nodes.handle_tool(name, arguments)
-        elif name.startswith("pve_vm"):
-            result = vms.handle_tool(name, arguments)
-        elif name.startswith("pve_container"):
-            result = containers.handle_tool(name, arguments)
-        elif name.startswith("pve_storage"):
-            result = storage.handle_tool(name, arguments)
-        elif name.startswith("pve_network"):
-            result = network.handle_tool(name, arguments)
-        elif name.startswith("pve_backup") or name.startswith("pve_snapshot"):
-            result = backup.handle_tool(name, arguments)
+        if trace is not None:
+            # Handlers may pop from arguments, so keep a serialized copy
+            args_text = json.dumps(redact_arguments(name, arguments), default=str)
+            trace.add_span("arguments", start, time.perf_counter() - start,
+                           arguments=args_text[:1000], bytes=len(args_text))
+        with tracer.span("handler"):
+            # Handlers block on API requests; running them in a worker thread lets
+            # calls overlap so the scheduler can put interactive requests first.
+            # to_thread copies the context, keeping trace and priority.
+            result = await _offload(dispatch, name, arguments)
+        if isinstance(result, Iterator):
+            # Listing generators do their API requests while being consumed
+            with tracer.span("stream_result"):
+                contents = await stream_result(result, **stream_options)
         else:
-            result = {"error": f"Unknown tool: {name}"}
-
-        return [TextContent(type="text", text=format_result(result))]
+            with tracer.span("format_result"):
+                contents = [TextContent(type="text", text=format_result(result))]
 
     except Exception as e:
-        return [TextContent(type="text", text=format_result({"error": str(e)}))]
+        error = type(e).__name__
+        contents = [TextContent(type="text", text=format_result({"error": str(e)}))]
+
+    size = sum(len(content.text) for content in contents)
+    metrics.record_tool(name, time.perf_counter() - start, size, error)
+    metrics.maybe_export()
+    tracer.finish(trace, error)
+    return contents
 
 
 def main():
@@ -70,6 +186,11 @@ def main():
 
 async def run_server():
     """Run the MCP server with stdio transport."""
+    if os.environ.get("PROXMOX_MCP_METRICS_PORT"):
+        metrics.serve(
+            os.environ.get("PROXMOX_MCP_METRICS_HOST", "127.0.0.1"),
+            int(os.environ["PROXMOX_MCP_METRICS_PORT"]),
+        )
     async with stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
@@ -0,0 +1,956 @@
+"""In-process Proxmox VE API simulator for offline testing and benchmarks.
+
+The simulator implements the subset of the PVE HTTP API used by ProxmoxClient
+on top of an in-memory cluster model with configurable size, latency and
+failure rate. It can be used in-process (no sockets) from tests::
+
+    from proxmox_mcp.simulator import simulate
+
+    with simulate(nodes=3, vms=1000, containers=200, latency=0.005) as cluster:
+        client.list_vms()
+        assert cluster.calls["GET /nodes/{node}/qemu"] == 3
+
+or from the command line, either serving the fake API over HTTP(S) or running
+the MCP server against a simulated cluster::
+
+    python -m proxmox_mcp.simulator http --port 8006 --vms 5000
+    python -m proxmox_mcp.simulator mcp --vms 5000 --latency 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import shlex
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import pairwise
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from proxmoxer import ProxmoxAPI
+from requests.adapters import BaseAdapter
+
+from .client import ProxmoxClient, client
+
+SIM_HOST = "pve.simulator.invalid"
+SIM_PORT = 8006
+API_PREFIX = "/api2/json"
+
+DAY = 86400
+
+
+class SimulatedError(Exception):
+    """An API error returned to the caller with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _mac(seed: int) -> str:
+    return "BC:24:11:" + ":".join(f"{(seed >> shift) & 0xFF:02X}" for shift in (16, 8, 0))
+
+
+class SimulatedCluster:
+    """In-memory model of a Proxmox VE cluster.
+
+    Args:
+        nodes: Number of cluster nodes (pve1, pve2, ...)
+        vms: Number of qemu guests, spread round-robin over nodes (VMIDs from 100)
+        containers: Number of LXC guests, numbered after the VMs
+        snapshots: Snapshots per guest, one per day going back from now
+        backups: Backups per guest on the node's "local" storage
+        latency: Seconds added to every request
+        jitter: Extra random latency, uniform in [0, jitter] seconds
+        failure_rate: Probability in [0, 1] that a request fails with HTTP 500
+        task_duration: Seconds a task stays "running"; the guest is locked meanwhile
+        seed: Random seed for reproducible clusters and failures
+    """
+
+    def __init__(
+        self,
+        nodes: int = 3,
+        vms: int = 30,
+        containers: int = 10,
+        snapshots: int = 3,
+        backups: int = 1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        task_duration: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.task_duration = task_duration
+        self.now = int(time.time())
+        self.calls: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._tasks: dict[str, dict[str, Any]] = {}
+        self._task_counter = 0
+        self._agent_pid = 0
+
+        self.nodes = [f"pve{i + 1}" for i in range(max(1, nodes))]
+        self.guests: dict[int, dict[str, Any]] = {}
+        # (node, storage) -> extra volumes not derived from guest configs
+        self.volumes: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        for node in self.nodes:
+            self.volumes[(node, "local")] = [
+                {"volid": "local:iso/debian-12.5.0-amd64-netinst.iso", "content": "iso",
+                 "format": "iso", "size": 658505728, "ctime": self.now - 90 * DAY},
+                {"volid": "local:vztmpl/debian-12-standard_12.2-1_amd64.tar.zst",
+                 "content": "vztmpl", "format": "tzst", "size": 126371647,
+                 "ctime": self.now - 90 * DAY},
+            ]
+            # A leftover disk of a guest that no longer exists
+            orphan = 990000 + self.nodes.index(node)
+            self.volumes[(node, "local-lvm")] = [
+                {"volid": f"local-lvm:vm-{orphan}-disk-0", "content": "images", "format": "raw",
+                 "size": 16 << 30, "vmid": orphan},
+            ]
+
+        for i in range(vms + containers):
+            vmid = 100 + i
+            vm_type = "qemu" if i < vms else "lxc"
+            node = self.nodes[i % len(self.nodes)]
+            self.guests[vmid] = self._new_guest(vmid, vm_type, node, snapshots)
+            for b in range(backups):
+                self._add_backup(node, "local", vmid, vm_type, self.now - (b + 1) * DAY)
+
+        self._routes: list[tuple[str, re.Pattern[str], str, Callable[..., Any]]] = []
+        for method, template, handler in self._route_table():
+            pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template)
+            self._routes.append((method, re.compile(f"^{pattern}$"), template, handler))
+
+    # Model helpers
+    def _new_guest(self, vmid: int, vm_type: str, node: str, snapshots: int) -> dict[str, Any]:
+        mac = _mac(vmid)
+        if vm_type == "qemu":
+            config = {
+                "name": f"vm-{vmid}",
+                "memory": 4096 if vmid % 10 == 0 else 2048,
+                "cores": 2,
+                "sockets": 1,
+                "cpu": "x86-64-v2-AES",
+                "ostype": "l26",
+                "scsihw": "virtio-scsi-single",
+                "scsi0": f"local-lvm:vm-{vmid}-disk-0,iothread=1,size=32G",
+                "ide2": "none,media=cdrom",
+                "net0": f"virtio={mac},bridge=vmbr0,firewall=1",
+                "boot": "order=scsi0;ide2;net0",
+                "agent": "1",
+                "vmgenid": f"{vmid:08x}-0000-4000-8000-000000000000",
+                "smbios1": f"uuid={vmid:08x}-0000-4000-8000-000000000001",
+            }
+        else:
+            config = {
+                "hostname": f"ct-{vmid}",
+                "memory": 512,
+                "swap": 512,
+                "cores": 1,
+                "ostype": "debian",
+                "arch": "amd64",
+                "rootfs": f"local-lvm:vm-{vmid}-disk-0,size=8G",
+                "net0": f"name=eth0,bridge=vmbr0,hwaddr={mac},ip=dhcp,type=veth",
+                "unprivileged": 1,
+            }
+        snaps = []
+        for s in range(snapshots):
+            snaps.append({
+                "name": f"auto-{s}",
+                "snaptime": self.now - (snapshots - s) * DAY,
+                "description": "simulated snapshot",
+            })
+        return {
+            "vmid": vmid,
+            "type": vm_type,
+            "node": node,
+            "status": "running" if vmid % 3 else "stopped",
+            "tags": "sim" if vmid % 2 else "sim;web",
+            "template": 0,
+            "config": config,
+            "snapshots": snaps,
+            "locked_until": 0.0,
+            # Guest agent state: path -> bytes, pid -> finished command
+            "files": {},
+            "processes": {},
+        }
+
+    def _add_backup(self, node, storage, vmid, vm_type, ctime):
+        stamp = time.strftime("%Y_%m_%d-%H_%M_%S", time.gmtime(ctime))
+        kind = "qemu" if vm_type == "qemu" else "lxc"
+        ext = "vma.zst" if vm_type == "qemu" else "tar.zst"
+        self.volumes.setdefault((node, storage), []).append({
+            "volid": f"{storage}:backup/vzdump-{kind}-{vmid}-{stamp}.{ext}",
+            "content": "backup",
+            "format": ext,
+            "size": 512 * 1024 * 1024,
+            "ctime": ctime,
+            "vmid": vmid,
+        })
+
+    def _guest(self, node: str, vm_type: str, vmid: str | int) -> dict[str, Any]:
+        self._node(node)
+        guest = self.guests.get(int(vmid))
+        if guest is None or guest["node"] != node or guest["type"] != vm_type:
+            kind = "VM" if vm_type == "qemu" else "CT"
+            raise SimulatedError(500, f"Configuration file for {kind} {vmid} does not exist")
+        return guest
+
+    def _node(self, node: str) -> str:
+        if node not in self.nodes:
+            raise SimulatedError(595, f"no such cluster node '{node}'")
+        return node
+
+    def _lock_guest(self, guest: dict[str, Any], action: str) -> None:
+        if guest["locked_until"] > time.monotonic():
+            raise SimulatedError(
+                500, f"can't lock file '/var/lock/qemu-server/lock-{guest['vmid']}.conf' - got timeout"
+            )
+        guest["locked_until"] = time.monotonic() + self.task_duration
+
+    def _task(self, node: str, task_type: str, task_id: Any, exitstatus: str = "OK") -> str:
+        self._task_counter += 1
+        upid = (
+            f"UPID:{node}:{self._task_counter:08X}:00000000:{self.now:08X}:"
+            f"{task_type}:{task_id}:root@pam!sim:"
+        )
+        self._tasks[upid] = {
+            "node": node,
+            "type": task_type,
+            "id": str(task_id),
+            "started": time.monotonic(),
+            "exitstatus": exitstatus,
+        }
+        return upid
+
+    def _disk_size(self, spec: str) -> int:
+        match = re.search(r"size=(\d+)([KMGT]?)", spec)
+        if not match:
+            return 0
+        factor = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}[match.group(2)]
+        return int(match.group(1)) * factor
+
+    def _agent(self, node: str, vmid: str | int) -> dict[str, Any]:
+        guest = self._guest(node, "qemu", vmid)
+        if guest["status"] != "running":
+            raise SimulatedError(500, f"VM {guest['vmid']} is not running")
+        if str(guest["config"].get("agent", "0")).split(",")[0] not in ("1", "enabled=1"):
+            raise SimulatedError(500, "No QEMU guest agent configured")
+        return guest
+
+    def _run(self, guest: dict[str, Any], argv: list[str], stdin: bytes = b""):
+        """Simulate a guest command; returns (exitcode, stdout, stderr, seconds)."""
+        if not argv:
+            return 127, b"", b"missing command\n", 0.0
+        name, args = argv[0], [a for a in argv[1:] if a != "--"]
+        files = guest["files"]
+        if name == "sh" and args[:1] == ["-c"] and len(args) > 1:
+            return self._run_script(guest, args[1], args[2:])
+        if name in ("true", "false"):
+            return int(name == "false"), b"", b"", 0.0
+        if name == "sleep":
+            return 0, b"", b"", float(args[0]) if args else 0.0
+        if name == "echo":
+            return 0, (" ".join(args) + "\n").encode(), b"", 0.0
+        if name == "hostname":
+            return 0, f"{guest['config'].get('name', guest['vmid'])}\n".encode(), b"", 0.0
+        if name == "cat":
+            if not args:
+                return 0, stdin, b"", 0.0
+            missing = [f for f in args if f not in files]
+            if missing:
+                return 1, b"", f"cat: {missing[0]}: No such file or directory\n".encode(), 0.0
+            return 0, b"".join(files[f] for f in args), b"", 0.0
+        if name == "rm":
+            for f in args:
+                if not f.startswith("-"):
+                    files.pop(f, None)
+            return 0, b"", b"", 0.0
+        return 0, f"simulated output of {' '.join(argv)}\n".encode(), b"", 0.0
+
+    def _run_script(self, guest, script, args):
+        """Run "cmd && cmd > file" scripts with $0 and "$@" expanded from args."""
+        out, err, seconds, exitcode = b"", b"", 0.0, 0
+        for segment in script.split("&&"):
+            argv = []
+            for token in shlex.split(segment):
+                if token == "$@":
+                    argv += args[1:]
+                else:
+                    argv.append(args[0] if token == "$0" and args else token)
+            target = None
+            if ">" in argv:
+                index = argv.index(">")
+                argv, target = argv[:index], argv[index + 1]
+            exitcode, stdout, stderr, duration = self._run(guest, argv)
+            err += stderr
+            seconds += duration
+            if target is not None and exitcode == 0:
+                guest["files"][target] = stdout
+            elif target is None:
+                out += stdout
+            if exitcode:
+                break
+        return exitcode, out, err, seconds
+
+    # Request entry point
+    def request(
+        self, method: str, path: str, params: dict[str, Any] | None = None
+    ) -> tuple[int, Any, str]:
+        """Handle an API request; returns (status, data, reason).
+
+        path is relative to /api2/json, e.g. "/nodes/pve1/qemu".
+        """
+        delay = self.latency
+        with self._lock:
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+
+        for route_method, pattern, template, handler in self._routes:
+            if route_method != method:
+                continue
+            match = pattern.match(path.rstrip("/") or "/")
+            if match:
+                break
+        else:
+            return 501, None, f"Method '{method} {path}' not implemented"
+
+        with self._lock:
+            self.calls[f"{method} {template}"] += 1
+            if fail:
+                return 500, None, "simulated failure"
+            try:
+                return 200, handler(params or {}, **match.groupdict()), "OK"
+            except SimulatedError as e:
+                return e.status, None, e.message
+
+    def _route_table(self) -> list[tuple[str, str, Callable[..., Any]]]:
+        routes = [
+            ("GET", "/nodes", self._get_nodes),
+            ("GET", "/nodes/{node}/status", self._get_node_status),
+            ("GET", "/nodes/{node}/network", self._get_network),
+            ("GET", "/nodes/{node}/tasks/{upid}/status", self._get_task_status),
+            ("GET", "/cluster/resources", self._get_resources),
+            ("GET", "/storage", self._get_storage_config),
+            ("GET", "/nodes/{node}/storage", self._get_node_storage),
+            ("GET", "/nodes/{node}/storage/{storage}/content", self._get_content),
+            ("GET", "/nodes/{node}/storage/{storage}/rrddata", self._get_storage_rrddata),
+            ("POST", "/nodes/{node}/vzdump", self._post_vzdump),
+        ]
+        for vm_type in ("qemu", "lxc"):
+            base = f"/nodes/{{node}}/{vm_type}"
+
+            def bind(handler, vm_type=vm_type):
+                return lambda params, **kw: handler(vm_type, params, **kw)
+
+            routes += [
+                ("GET", base, bind(self._get_guests)),
+                ("POST", base, bind(self._create_guest)),
+                ("GET", f"{base}/{{vmid}}/config", bind(self._get_config)),
+                ("GET", f"{base}/{{vmid}}/status/current", bind(self._get_status)),
+                ("POST", f"{base}/{{vmid}}/status/{{action}}", bind(self._post_status)),
+                ("DELETE", f"{base}/{{vmid}}", bind(self._delete_guest)),
+                ("POST", f"{base}/{{vmid}}/clone", bind(self._clone_guest)),
+                ("GET", f"{base}/{{vmid}}/snapshot", bind(self._get_snapshots)),
+                ("POST", f"{base}/{{vmid}}/snapshot", bind(self._create_snapshot)),
+                ("POST", f"{base}/{{vmid}}/snapshot/{{snapname}}/rollback",
+                 bind(self._rollback_snapshot)),
+                ("DELETE", f"{base}/{{vmid}}/snapshot/{{snapname}}", bind(self._delete_snapshot)),
+            ]
+        agent = "/nodes/{node}/qemu/{vmid}/agent"
+        routes += [
+            ("POST", f"{agent}/exec", self._agent_exec),
+            ("GET", f"{agent}/exec-status", self._agent_exec_status),
+            ("GET", f"{agent}/file-read", self._agent_file_read),
+            ("POST", f"{agent}/file-write", self._agent_file_write),
+            ("GET", f"{agent}/network-get-interfaces", self._agent_interfaces),
+        ]
+        return routes
+
+    # Handlers
+    def _get_nodes(self, params):
+        return [
+            {"node": node, "id": f"node/{node}", "type": "node", "status": "online",
+             "cpu": 0.12, "maxcpu": 32, "mem": 48 << 30, "maxmem": 128 << 30,
+             "uptime": 864000}
+            for node in self.nodes
+        ]
+
+    def _get_node_status(self, params, node):
+        self._node(node)
+        return {
+            "cpu": 0.12, "uptime": 864000, "loadavg": ["1.02", "0.95", "0.90"],
+            "memory": {"total": 128 << 30, "used": 48 << 30, "free": 80 << 30},
+            "cpuinfo": {"cpus": 32, "model": "Simulated CPU", "sockets": 2},
+            "kversion": "Linux 6.8.12-1-pve", "pveversion": "pve-manager/8.2.4",
+        }
+
+    def _get_network(self, params, node):
+        index = self.nodes.index(self._node(node)) + 1
+        return [
+            {"iface": "eno1", "type": "eth", "active": 1, "autostart": 1},
+            {"iface": "vmbr0", "type": "bridge", "active": 1, "autostart": 1,
+             "bridge_ports": "eno1", "cidr": f"10.0.0.{index}/24", "gateway": "10.0.0.254"},
+        ]
+
+    def _get_task_status(self, params, node, upid):
+        task = self._tasks.get(upid)
+        if task is None or task["node"] != node:
+            raise SimulatedError(500, f"no such task '{upid}'")
+        status = {"upid": upid, "node": node, "type": task["type"], "id": task["id"],
+                  "user": "root@pam!sim", "starttime": self.now}
+        if time.monotonic() - task["started"] < self.task_duration:
+            status["status"] = "running"
+        else:
+            status.update(status="stopped", exitstatus=task["exitstatus"])
+        return status
+
+    def _resource(self, guest):
+        disk = sum(
+            self._disk_size(v) for k, v in guest["config"].items()
+            if re.match(r"^(scsi|virtio|sata|ide|mp)\d+$|^rootfs$", k) and "media=cdrom" not in v
+        )
+        return {
+            "id": f"{guest['type']}/{guest['vmid']}",
+            "type": guest["type"],
+            "vmid": guest["vmid"],
+            "node": guest["node"],
+            "name": guest["config"].get("name") or guest["config"].get("hostname"),
+            "status": guest["status"],
+            "tags": guest["tags"],
+            "template": guest["template"],
+            "maxmem": guest["config"]["memory"] << 20,
+            "mem": (guest["config"]["memory"] << 19) if guest["status"] == "running" else 0,
+            "maxcpu": guest["config"]["cores"],
+            "cpu": 0.05 if guest["status"] == "running" else 0,
+            "maxdisk": disk,
+            "uptime": 3600 if guest["status"] == "running" else 0,
+        }
+
+    def _get_resources(self, params):
+        kind = params.get("type")
+        resources = []
+        if kind in (None, "node"):
+            resources += [dict(n, type="node") for n in self._get_nodes(params)]
+        if kind in (None, "vm"):
+            resources += [self._resource(g) for g in self.guests.values()]
+        if kind in (None, "storage"):
+            for node in self.nodes:
+                for s in self._get_node_storage(params, node):
+                    resources.append({
+                        "id": f"storage/{node}/{s['storage']}", "type": "storage",
+                        "node": node, "storage": s["storage"], "status": "available",
+                        "maxdisk": s["total"], "disk": s["used"], "shared": s["shared"],
+                        "plugintype": s["type"], "content": s["content"],
+                    })
+        return resources
+
+    def _get_storage_config(self, params):
+        return [
+            {"storage": "local", "type": "dir", "path": "/var/lib/vz",
+             "content": "iso,vztmpl,backup", "shared": 0, "digest": "0" * 40},
+            {"storage": "local-lvm", "type": "lvmthin", "thinpool": "data", "vgname": "pve",
+             "content": "images,rootdir", "shared": 0, "digest": "0" * 40},
+        ]
+
+    def _get_node_storage(self, params, node):
+        self._node(node)
+        result = []
+        for s in self._get_storage_config(params):
+            used = sum(v["size"] for v in self._content(node, s["storage"]))
+            total = 4 << 40
+            result.append({
+                "storage": s["storage"], "type": s["type"], "content": s["content"],
+                "active": 1, "enabled": 1, "shared": 0,
+                "total": total, "used": used, "avail": total - used,
+                "used_fraction": used / total,
+            })
+        return result
+
+    def _content(self, node, storage):
+        volumes = list(self.volumes.get((node, storage), []))
+        for guest in self.guests.values():
+            if guest["node"] != node:
+                continue
+            for key, value in guest["config"].items():
+                if not re.match(r"^(scsi|virtio|sata|ide|efidisk|tpmstate|unused|mp)\d+$|^rootfs$",
+                                key):
+                    continue
+                volid = value.split(",", 1)[0]
+                if not volid.startswith(f"{storage}:") or "media=cdrom" in value:
+                    continue
+                volumes.append({
+                    "volid": volid,
+                    "content": "images" if guest["type"] == "qemu" else "rootdir",
+                    "format": "raw",
+                    "size": self._disk_size(value),
+                    "vmid": guest["vmid"],
+                })
+        return volumes
+
+    def _get_content(self, params, node, storage):
+        self._node(node)
+        if (node, storage) not in self.volumes:
+            raise SimulatedError(500, f"storage '{storage}' does not exist")
+        content = self._content(node, storage)
+        if params.get("content"):
+            content = [v for v in content if v["content"] == params["content"]]
+        if params.get("vmid"):
+            content = [v for v in content if v.get("vmid") == int(params["vmid"])]
+        return content
+
+    def _get_storage_rrddata(self, params, node, storage):
+        self._node(node)
+        if (node, storage) not in self.volumes:
+            raise SimulatedError(500, f"storage '{storage}' does not exist")
+        step = {"hour": 60, "day": 1800, "week": 10800, "month": 43200, "year": 604800}.get(
+            params.get("timeframe", "hour"), 60
+        )
+        used = sum(v["size"] for v in self._content(node, storage))
+        total = 4 << 40
+        # Usage grew linearly by a third over the window, with some noise
+        growth = used / 3 / (69 * step)
+        noise = random.Random(f"{node}/{storage}")
+        samples = []
+        for i in range(70):
+            t = self.now - (69 - i) * step
+            value = used - growth * (self.now - t) + noise.uniform(-1, 1) * growth * step * 2
+            samples.append({"time": t, "total": total, "used": max(0.0, value)})
+        return samples
+
+    def _post_vzdump(self, params, node):
+        self._node(node)
+        vmid = int(params["vmid"])
+        guest = self.guests.get(vmid)
+        if guest is None or guest["node"] != node:
+            raise SimulatedError(500, f"guest {vmid} is not on node {node}")
+        storage = params.get("storage", "local")
+        self._add_backup(node, storage, vmid, guest["type"], int(time.time()))
+        return self._task(node, "vzdump", vmid)
+
+    def _get_guests(self, vm_type, params, node):
+        self._node(node)
+        result = []
+        for guest in self.guests.values():
+            if guest["node"] == node and guest["type"] == vm_type:
+                resource = self._resource(guest)
+                del resource["id"], resource["type"], resource["node"]
+                result.append(resource)
+        return result
+
+    def _create_guest(self, vm_type, params, node):
+        self._node(node)
+        vmid = int(params.pop("vmid"))
+        if vmid in self.guests:
+            raise SimulatedError(500, f"unable to create {vm_type} {vmid}: config file already exists")
+        guest = self._new_guest(vmid, vm_type, node, 0)
+        guest["status"] = "stopped"
+        guest["config"].update(
+            {k: int(v) if str(v).isdigit() else v for k, v in params.items()}
+        )
+        self.guests[vmid] = guest
+        return self._task(node, f"{vm_type}create", vmid)
+
+    def _get_config(self, vm_type, params, node, vmid):
+        guest = self._guest(node, vm_type, vmid)
+        config = dict(guest["config"])
+        config["digest"] = hashlib.sha1(
+            json.dumps(config, sort_keys=True).encode()
+        ).hexdigest()
+        return config
+
+    def _get_status(self, vm_type, params, node, vmid):
+        guest = self._guest(node, vm_type, vmid)
+        status = self._resource(guest)
+        del status["id"], status["node"]
+        if vm_type == "qemu":
+            status["qmpstatus"] = guest["status"]
+            status["agent"] = 1
+        return status
+
+    def _post_status(self, vm_type, params, node, vmid, action):
+        guest = self._guest(node, vm_type, vmid)
+        if action not in ("start", "stop", "shutdown", "reboot"):
+            raise SimulatedError(501, f"Method 'POST status/{action}' not implemented")
+        self._lock_guest(guest, action)
+        guest["status"] = "stopped" if action in ("stop", "shutdown") else "running"
+        return self._task(node, f"{vm_type}{action}", vmid)
+
+    def _delete_guest(self, vm_type, params, node, vmid):
+        guest = self._guest(node, vm_type, vmid)
+        if guest["status"] == "running":
+            raise SimulatedError(500, f"{vm_type} {vmid} is running - destroy failed")
+        self._lock_guest(guest, "destroy")
+        del self.guests[guest["vmid"]]
+        return self._task(node, f"{vm_type}destroy", vmid)
+
+    def _clone_guest(self, vm_type, params, node, vmid):
+        guest = self._guest(node, vm_type, vmid)
+        newid = int(params["newid"])
+        if newid in self.guests:
+            raise SimulatedError(500, f"unable to create VM {newid}: config file already exists")
+        target = params.get("target", node)
+        clone = self._new_guest(newid, vm_type, self._node(target), 0)
+        config = {
+            k: v.replace(f"vm-{guest['vmid']}-", f"vm-{newid}-") if isinstance(v, str) else v
+            for k, v in guest["config"].items()
+        }
+        config["net0"] = clone["config"]["net0"]
+        if "name" in params:
+            config["name"] = params["name"]
+        clone.update(config=config, status="stopped")
+        self.guests[newid] = clone
+        return self._task(node, f"{vm_type}clone", vmid)
+
+    def _get_snapshots(self, vm_type, params, node, vmid):
+        guest = self._guest(node, vm_type, vmid)
+        snaps = [dict(s) for s in guest["snapshots"]]
+        for prev, snap in pairwise(snaps):
+            snap["parent"] = prev["name"]
+        current = {"name": "current", "description": "You are here!",
+                   "running": int(guest["status"] == "running")}
+        if snaps:
+            current["parent"] = snaps[-1]["name"]
+        return snaps + [current]
+
+    def _create_snapshot(self, vm_type, params, node, vmid):
+        guest = self._guest(node, vm_type, vmid)
+        name = params["snapname"]
+        if any(s["name"] == name for s in guest["snapshots"]):
+            raise SimulatedError(500, f"snapshot name '{name}' already used")
+        self._lock_guest(guest, "snapshot")
+        guest["snapshots"].append({
+            "name": name, "snaptime": int(time.time()),
+            "description": params.get("description", ""),
+        })
+        return self._task(node, f"{vm_type}snapshot", vmid)
+
+    def _find_snapshot(self, guest, name):
+        for snap in guest["snapshots"]:
+            if snap["name"] == name:
+                return snap
+        raise SimulatedError(500, f"snapshot '{name}' does not exist")
+
+    def _rollback_snapshot(self, vm_type, params, node, vmid, snapname):
+        guest = self._guest(node, vm_type, vmid)
+        self._find_snapshot(guest, snapname)
+        self._lock_guest(guest, "rollback")
+        return self._task(node, f"{vm_type}rollback", vmid)
+
+    def _delete_snapshot(self, vm_type, params, node, vmid, snapname):
+        guest = self._guest(node, vm_type, vmid)
+        snap = self._find_snapshot(guest, snapname)
+        self._lock_guest(guest, "snapshot-delete")
+        guest["snapshots"].remove(snap)
+        return self._task(node, f"{vm_type}delsnapshot", vmid)
+
+    def _agent_exec(self, params, node, vmid):
+        guest = self._agent(node, vmid)
+        command = params.get("command")
+        argv = command if isinstance(command, list) else shlex.split(command or "")
+        exitcode, out, err, seconds = self._run(
+            guest, argv, params.get("input-data", "").encode()
+        )
+        self._agent_pid += 1
+        guest["processes"][self._agent_pid] = {
+            "done_at": time.monotonic() + seconds, "exitcode": exitcode, "out": out, "err": err,
+        }
+        return {"pid": self._agent_pid}
+
+    def _agent_exec_status(self, params, node, vmid):
+        guest = self._agent(node, vmid)
+        process = guest["processes"].get(int(params.get("pid", 0)))
+        if process is None:
+            raise SimulatedError(500, "Agent error: Invalid parameter 'pid'")
+        if time.monotonic() < process["done_at"]:
+            return {"exited": 0}
+        # Like qemu-ga, a finished process is forgotten once its status was read
+        del guest["processes"][int(params["pid"])]
+        status = {"exited": 1, "exitcode": process["exitcode"]}
+        if process["out"]:
+            status["out-data"] = process["out"].decode(errors="replace")
+        if process["err"]:
+            status["err-data"] = process["err"].decode(errors="replace")
+        return status
+
+    def _agent_file_read(self, params, node, vmid):
+        guest = self._agent(node, vmid)
+        path = params.get("file", "")
+        if path not in guest["files"]:
+            raise SimulatedError(
+                500, f"Agent error: Failed to open file '{path}': No such file or directory"
+            )
+        data = guest["files"][path]
+        result = {"content": data[:16 << 20].decode(errors="replace"), "bytes-read": len(data)}
+        if len(data) > 16 << 20:
+            result["truncated"] = 1
+        return result
+
+    def _agent_file_write(self, params, node, vmid):
+        guest = self._agent(node, vmid)
+        content = params.get("content", "")
+        if len(content) > 61440:
+            raise SimulatedError(
+                400, "Parameter verification failed: content: "
+                "value may only be 61440 characters long",
+            )
+        encode = str(params.get("encode", "1")) not in ("0", "false")
+        guest["files"][params["file"]] = content.encode() if encode else base64.b64decode(content)
+
+    def _agent_interfaces(self, params, node, vmid):
+        guest = self._agent(node, vmid)
+        mac = _mac(guest["vmid"]).lower()
+        return {"result": [
+            {"name": "lo", "hardware-address": "00:00:00:00:00:00", "ip-addresses": [
+                {"ip-address-type": "ipv4", "ip-address": "127.0.0.1", "prefix": 8},
+            ]},
+            {"name": "eth0", "hardware-address": mac, "ip-addresses": [
+                {"ip-address-type": "ipv4", "prefix": 24,
+                 "ip-address": f"10.0.{(guest['vmid'] >> 8) & 255}.{guest['vmid'] & 255}"},
+            ]},
+        ]}
+
+
+def _params(query: str, body: Any) -> dict[str, Any]:
+    """Merge query and form parameters; repeated keys (e.g. exec commands) become lists."""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    if body:
+        if isinstance(body, bytes):
+            body = body.decode()
+        pairs += parse_qsl(body, keep_blank_values=True)
+    params: dict[str, Any] = {}
+    for key, value in pairs:
+        if key not in params:
+            params[key] = value
+        elif isinstance(params[key], list):
+            params[key].append(value)
+        else:
+            params[key] = [params[key], value]
+    return params
+
+
+def _api_path(path: str) -> str | None:
+    if not path.startswith(API_PREFIX):
+        return None
+    return path[len(API_PREFIX):] or "/"
+
+
+class SimulatorAdapter(BaseAdapter):
+    """requests transport adapter answering from a SimulatedCluster without sockets."""
+
+    def __init__(self, cluster: SimulatedCluster):
+        super().__init__()
+        self.cluster = cluster
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        path = _api_path(url.path)
+        if not request.headers.get("Authorization"):
+            status, data, reason = 401, None, "authentication failure"
+        elif path is None:
+            status, data, reason = 404, None, "Not Found"
+        else:
+            status, data, reason = self.cluster.request(
+                request.method, path, _params(url.query, request.body)
+            )
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.url = request.url
+        response.request = request
+        response.headers["Content-Type"] = "application/json;charset=UTF-8"
+        payload = {"data": data}
+        if status >= 400:
+            payload["errors"] = {"message": reason}
+        response._content = json.dumps(payload).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def connect(cluster: SimulatedCluster) -> ProxmoxAPI:
+    """Return a proxmoxer API object whose requests are served by cluster."""
+    api = ProxmoxAPI(
+        SIM_HOST,
+        port=SIM_PORT,
+        user="root@pam",
+        token_name="sim",
+        token_value="simulated",
+        verify_ssl=False,
+    )
+    # proxmoxer keeps its requests session in the resource store
+    api._store["session"].mount(f"https://{SIM_HOST}:{SIM_PORT}/", SimulatorAdapter(cluster))
+    return api
+
+
+@contextmanager
+def simulate(
+    cluster: SimulatedCluster | None = None,
+    target: ProxmoxClient = client,
+    **kwargs: Any,
+) -> Iterator[SimulatedCluster]:
+    """Point a ProxmoxClient (the global client by default) at a simulated cluster.
+
+    Keyword arguments are passed to SimulatedCluster when no cluster is given.
+    The previous API connection is restored on exit.
+    """
+    cluster = cluster or SimulatedCluster(**kwargs)
+    previous = target.use_api(connect(cluster))
+    try:
+        yield cluster
+    finally:
+        target.use_api(previous)
+
+
+def make_http_server(
+    cluster: SimulatedCluster,
+    host: str = "127.0.0.1",
+    port: int = SIM_PORT,
+    certfile: str | None = None,
+    keyfile: str | None = None,
+) -> ThreadingHTTPServer:
+    """Create an HTTP(S) server exposing the simulated API under /api2/json."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _handle(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            path = _api_path(url.path)
+            if path is None:
+                status, data, reason = 404, None, "Not Found"
+            else:
+                status, data, reason = cluster.request(self.command, path, _params(url.query, body))
+            payload = {"data": data}
+            if status >= 400:
+                payload["errors"] = {"message": reason}
+            content = json.dumps(payload).encode()
+            self.send_response(status, reason)
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    if certfile:
+        import ssl
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server
+
+
+def self_signed_certificate(directory: str, host: str = "localhost") -> tuple[str, str]:
+    """Generate a throwaway self-signed certificate with openssl; returns (cert, key)."""
+    certfile = os.path.join(directory, "sim.crt")
+    keyfile = os.path.join(directory, "sim.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+         "-subj", f"/CN={host}", "-keyout", keyfile, "-out", certfile],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
+
+
+def _cluster_from_args(args: argparse.Namespace) -> SimulatedCluster:
+    return SimulatedCluster(
+        nodes=args.nodes,
+        vms=args.vms,
+        containers=args.containers,
+        snapshots=args.snapshots,
+        backups=args.backups,
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        task_duration=args.task_duration,
+        seed=args.seed,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="proxmox-mcp-sim", description="Simulated Proxmox VE API"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    http = sub.add_parser("http", help="Serve the simulated API over HTTPS")
+    http.add_argument("--host", default="127.0.0.1")
+    http.add_argument("--port", type=int, default=SIM_PORT)
+    http.add_argument(
+        "--certfile", help="TLS certificate (a self-signed one is generated if omitted)"
+    )
+    http.add_argument("--keyfile", help="TLS private key")
+    http.add_argument(
+        "--plain-http", action="store_true",
+        help="Serve plain HTTP (not usable with ProxmoxClient, which always uses HTTPS)",
+    )
+    sub.add_parser("mcp", help="Run the MCP server over stdio against the simulator")
+    for p in sub.choices.values():
+        p.add_argument("--nodes", type=int, default=3)
+        p.add_argument("--vms", type=int, default=30)
+        p.add_argument("--containers", type=int, default=10)
+        p.add_argument("--snapshots", type=int, default=3)
+        p.add_argument("--backups", type=int, default=1)
+        p.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+        p.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds")
+        p.add_argument("--failure-rate", type=float, default=0.0)
+        p.add_argument("--task-duration", type=float, default=0.0)
+        p.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    cluster = _cluster_from_args(args)
+
+    if args.command == "http":
+        with tempfile.TemporaryDirectory() as tmp:
+            certfile, keyfile = args.certfile, args.keyfile
+            if not certfile and not args.plain_http:
+                try:
+                    certfile, keyfile = self_signed_certificate(tmp, args.host)
+                except (OSError, subprocess.CalledProcessError) as e:
+                    parser.error(f"could not generate a self-signed certificate ({e}); "
+                                 "pass --certfile/--keyfile or --plain-http")
+            server = make_http_server(cluster, args.host, args.port, certfile, keyfile)
+            scheme = "https" if certfile else "http"
+            print(f"Simulated Proxmox API on {scheme}://{args.host}:{args.port}{API_PREFIX}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    else:
+        from .server import main as run_mcp
+
+        with simulate(cluster):
+            run_mcp()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 """Proxmox MCP tools."""
 
-from . import nodes, vms, containers, storage, network, backup
+from . import nodes, vms, containers, storage, network, backup, config, stats, batch, agent
 
-__all__ = ["nodes", "vms", "containers", "storage", "network", "backup"]
+__all__ = [
+    "nodes", "vms", "containers", "storage", "network", "backup", "config", "stats", "batch",
+    "agent",
+]
@@ -0,0 +1,399 @@
+"""QEMU guest agent tools."""
+
+import base64
+import logging
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from mcp.types import Tool
+
+from ..client import client, iter_concurrent, map_concurrent
+from .common import GUEST_SELECTOR_SCHEMA, STREAM_MAX_ITEMS, STREAM_PROPERTIES
+
+logger = logging.getLogger(__name__)
+
+# PVE limits file-write content to 60 KiB; raw chunks of 45 KiB stay below it once base64 encoded
+WRITE_CHUNK = 45 * 1024
+# Concatenates the uploaded parts ($@) into the target file ($0) on Linux guests
+JOIN_SCRIPT = 'cat -- "$@" > "$0" && rm -f -- "$@"'
+
+TARGET_PROPERTIES = {
+    "node": {"type": "string", "description": "Node name"},
+    "vmid": {"type": "integer", "description": "VM ID"},
+    "selector": {
+        **GUEST_SELECTOR_SCHEMA,
+        "description": "Run on every VM matching this selector instead of node/vmid",
+    },
+}
+
+
+def get_tools() -> list[Tool]:
+    """Return guest agent tools."""
+    return [
+        Tool(
+            name="pve_agent_exec",
+            description=(
+                "Run a command inside one VM or every VM matching a selector through the "
+                "QEMU guest agent and wait for it to finish. Results from many VMs are "
+                "grouped by identical exit code and output"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    **TARGET_PROPERTIES,
+                    "command": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Command and arguments, e.g. [\"df\", \"-h\"]",
+                    },
+                    "input_data": {"type": "string", "description": "Data passed on stdin"},
+                    "timeout": {
+                        "type": "number",
+                        "description": "Seconds to wait for the command on each VM",
+                        "default": 30,
+                    },
+                    "max_output": {
+                        "type": "integer",
+                        "description": "Keep at most this many characters of stdout/stderr",
+                        "default": 65536,
+                    },
+                    "aggregate": {
+                        "type": "boolean",
+                        "description": "Group VMs with identical results (selector only)",
+                        "default": True,
+                    },
+                    "concurrency": {
+                        "type": "integer",
+                        "description": "VMs to run the command on at once (selector only)",
+                    },
+                    # Results cannot be paged: continuing would run the command again
+                    "stream": {
+                        **STREAM_PROPERTIES["stream"],
+                        "description": (
+                            "Return one result per VM as VMs finish, in compact JSON chunks "
+                            "with progress notifications (selector only)"
+                        ),
+                    },
+                    "chunk_size": STREAM_PROPERTIES["chunk_size"],
+                },
+                "required": ["command"],
+            },
+        ),
+        Tool(
+            name="pve_agent_file_read",
+            description=(
+                "Read a file inside a VM through the guest agent (at most 16 MiB); "
+                "use offset/length to page through large files"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "node": {"type": "string", "description": "Node name"},
+                    "vmid": {"type": "integer", "description": "VM ID"},
+                    "file": {"type": "string", "description": "Path inside the guest"},
+                    "offset": {
+                        "type": "integer",
+                        "description": "Return content starting at this character",
+                        "default": 0,
+                    },
+                    "length": {
+                        "type": "integer",
+                        "description": "Return at most this many characters",
+                        "default": 65536,
+                    },
+                },
+                "required": ["node", "vmid", "file"],
+            },
+        ),
+        Tool(
+            name="pve_agent_file_write",
+            description=(
+                "Write a file inside a VM through the guest agent. Content larger than "
+                "45 KiB is uploaded in chunks and joined in the guest (Linux guests only)"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "node": {"type": "string", "description": "Node name"},
+                    "vmid": {"type": "integer", "description": "VM ID"},
+                    "file": {"type": "string", "description": "Path inside the guest"},
+                    "content": {"type": "string", "description": "Content to write"},
+                    "base64": {
+                        "type": "boolean",
+                        "description": "content is base64 encoded (for binary files)",
+                        "default": False,
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "Seconds to wait for chunks to be joined",
+                        "default": 60,
+                    },
+                },
+                "required": ["node", "vmid", "file", "content"],
+            },
+        ),
+        Tool(
+            name="pve_agent_network",
+            description=(
+                "List network interfaces and IP addresses reported by the guest agent "
+                "of one VM or every VM matching a selector"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    **TARGET_PROPERTIES,
+                    "include_loopback": {
+                        "type": "boolean",
+                        "description": "Include the loopback interface",
+                        "default": False,
+                    },
+                },
+                "required": [],
+            },
+        ),
+    ]
+
+
+def _targets(arguments: dict[str, Any]) -> list[tuple[str, int]] | None:
+    """(node, vmid) pairs for a selector, or None for a single node/vmid target."""
+    if "selector" in arguments:
+        selector = dict(arguments["selector"], type="qemu")
+        return [(g["node"], g["vmid"]) for g in client.list_guests(selector)]
+    if "node" not in arguments or "vmid" not in arguments:
+        raise ValueError("Either node and vmid or selector is required")
+    return None
+
+
+def _clip(text: str, limit: int) -> tuple[str, bool]:
+    if len(text) > limit:
+        return text[:limit], True
+    return text, False
+
+
+def run_command(
+    node: str,
+    vmid: int,
+    command: list[str],
+    input_data: str | None = None,
+    timeout: float = 30,
+    max_output: int = 65536,
+) -> dict[str, Any]:
+    """Start a command through the guest agent and poll exec-status until it exits."""
+    start = time.monotonic()
+    pid = client.agent_exec(node, vmid, command, input_data)
+    delay = 0.1
+    while True:
+        status = client.agent_exec_status(node, vmid, pid)
+        if status.get("exited"):
+            break
+        remaining = start + timeout - time.monotonic()
+        if remaining <= 0:
+            # The agent has no way to kill the process; it keeps running in the guest
+            return {"timeout": True, "pid": pid, "elapsed": round(time.monotonic() - start, 3)}
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 1.0)
+
+    out, out_clipped = _clip(status.get("out-data", ""), max_output)
+    err, err_clipped = _clip(status.get("err-data", ""), max_output)
+    result = {"exitcode": status.get("exitcode"), "out": out, "err": err}
+    if "signal" in status:
+        result["signal"] = status["signal"]
+    if out_clipped or err_clipped or status.get("out-truncated") or status.get("err-truncated"):
+        result["truncated"] = True
+    result["elapsed"] = round(time.monotonic() - start, 3)
+    return result
+
+
+def _exec_results(
+    arguments: dict[str, Any], targets: list[tuple[str, int]]
+) -> Iterator[dict[str, Any]]:
+    """Run the command on every target concurrently, yielding results as VMs finish."""
+
+    def run(target: tuple[str, int]) -> dict[str, Any]:
+        return run_command(
+            target[0], target[1], arguments["command"], arguments.get("input_data"),
+            arguments.get("timeout", 30), arguments.get("max_output", 65536),
+        )
+
+    for (node, vmid), result, error in iter_concurrent(
+        run, targets, arguments.get("concurrency")
+    ):
+        if error is not None:
+            result = {"error": str(error)}
+        yield {"vmid": vmid, "node": node, **result}
+
+
+def _aggregate(results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Group VMs by identical outcome, largest group first."""
+    groups: dict[tuple, dict[str, Any]] = {}
+    for result in results:
+        if "error" in result:
+            key = ("error", result["error"])
+            outcome = {"error": result["error"]}
+        elif result.get("timeout"):
+            key = ("timeout",)
+            outcome = {"timeout": True}
+        else:
+            key = ("exit", result["exitcode"], result.get("signal"), result["out"], result["err"])
+            outcome = {k: result[k] for k in ("exitcode", "signal", "out", "err") if k in result}
+        group = groups.setdefault(key, {"vmids": [], **outcome})
+        group["vmids"].append(result["vmid"])
+    for group in groups.values():
+        group["vmids"].sort()
+
+    def count(predicate):
+        return sum(1 for r in results if predicate(r))
+
+    return {
+        "summary": {
+            "guests": len(results),
+            "succeeded": count(lambda r: r.get("exitcode") == 0),
+            "failed": count(lambda r: r.get("exitcode") not in (None, 0)),
+            "timed_out": count(lambda r: r.get("timeout")),
+            "errors": count(lambda r: "error" in r),
+            "distinct_results": len(groups),
+        },
+        "groups": sorted(groups.values(), key=lambda g: (-len(g["vmids"]), g["vmids"][0])),
+    }
+
+
+def agent_exec(arguments: dict[str, Any]) -> Any:
+    """Run a command on one VM, or on every selected VM with aggregated results."""
+    for option in ("offset", "max_items"):
+        if option in arguments:
+            raise ValueError(f"{option} is not supported: results of a command cannot be paged")
+    targets = _targets(arguments)
+    if targets is None:
+        result = run_command(
+            arguments["node"], arguments["vmid"], arguments["command"],
+            arguments.get("input_data"), arguments.get("timeout", 30),
+            arguments.get("max_output", 65536),
+        )
+        return {"vmid": arguments["vmid"], "node": arguments["node"], **result}
+    if arguments.get("stream"):
+        # A chunked response holds at most STREAM_MAX_ITEMS results; refuse up
+        # front rather than run the command on VMs whose results would be dropped
+        if len(targets) > STREAM_MAX_ITEMS:
+            raise ValueError(
+                f"Selector matches {len(targets)} VMs; streaming supports at most "
+                f"{STREAM_MAX_ITEMS}. Narrow the selector or omit stream"
+            )
+        return _exec_results(arguments, targets)
+    results = list(_exec_results(arguments, targets))
+    if not arguments.get("aggregate", True):
+        return sorted(results, key=lambda r: r["vmid"])
+    return _aggregate(results)
+
+
+def read_file(node: str, vmid: int, file: str, offset: int = 0, length: int = 65536) -> dict:
+    """Read a guest file and return one page of its content."""
+    data = client.agent_file_read(node, vmid, file)
+    content = data.get("content", "")
+    end = offset + length
+    result = {
+        "file": file,
+        "size": len(content),
+        "offset": offset,
+        "content": content[offset:end],
+        "next_offset": end if end < len(content) else None,
+    }
+    if data.get("truncated"):
+        result["truncated"] = True
+    return result
+
+
+def write_file(node: str, vmid: int, file: str, data: bytes, timeout: float = 60) -> dict:
+    """Write a guest file, uploading it in chunks joined in the guest when it is large."""
+
+    def upload(part: tuple[str, bytes]) -> None:
+        path, chunk = part
+        client.agent_file_write(node, vmid, path, base64.b64encode(chunk).decode(), encode=False)
+
+    if len(data) <= WRITE_CHUNK:
+        upload((file, data))
+        return {"file": file, "bytes": len(data), "chunks": 1}
+
+    parts = [
+        (f"{file}.part{i // WRITE_CHUNK:05d}", data[i:i + WRITE_CHUNK])
+        for i in range(0, len(data), WRITE_CHUNK)
+    ]
+    paths = [path for path, _ in parts]
+    failed = [e for _, _, e in map_concurrent(upload, parts, workers=4) if e is not None]
+    joined = None
+    if not failed:
+        joined = run_command(node, vmid, ["sh", "-c", JOIN_SCRIPT, file, *paths], timeout=timeout)
+    if failed or joined.get("timeout") or joined.get("exitcode") != 0:
+        try:
+            run_command(node, vmid, ["rm", "-f", "--", *paths], timeout=10)
+        except Exception:
+            # Report the original failure; leftover parts are only logged
+            logger.warning("Removing chunks of %s on %s failed", file, vmid, exc_info=True)
+        if failed:
+            raise RuntimeError(f"Uploading chunks of {file} failed: {failed[0]}")
+        reason = "timed out" if joined.get("timeout") else joined.get("err", "").strip()
+        raise RuntimeError(f"Joining chunks of {file} failed: {reason}")
+    return {"file": file, "bytes": len(data), "chunks": len(parts)}
+
+
+def _interfaces(node: str, vmid: int, include_loopback: bool) -> list[dict[str, Any]]:
+    interfaces = []
+    for iface in client.agent_network_interfaces(node, vmid):
+        if iface.get("name") == "lo" and not include_loopback:
+            continue
+        interfaces.append({
+            "name": iface.get("name"),
+            "mac": iface.get("hardware-address"),
+            "addresses": [
+                f"{a['ip-address']}/{a['prefix']}" for a in iface.get("ip-addresses", [])
+            ],
+        })
+    return interfaces
+
+
+def network_interfaces(arguments: dict[str, Any]) -> Any:
+    """Interfaces of one VM, or a map of vmid -> interfaces for a selector."""
+    include_loopback = arguments.get("include_loopback", False)
+    targets = _targets(arguments)
+    if targets is None:
+        return _interfaces(arguments["node"], arguments["vmid"], include_loopback)
+    results = {}
+    for (node, vmid), interfaces, error in map_concurrent(
+        lambda t: _interfaces(t[0], t[1], include_loopback), targets
+    ):
+        results[str(vmid)] = {"error": str(error)} if error is not None else interfaces
+    return {
+        "summary": {
+            "guests": len(results),
+            "errors": sum(1 for r in results.values() if isinstance(r, dict)),
+        },
+        "results": results,
+    }
+
+
+def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Handle guest agent tool calls."""
+    if name == "pve_agent_exec":
+        return agent_exec(arguments)
+    elif name == "pve_agent_file_read":
+        return read_file(
+            arguments["node"],
+            arguments["vmid"],
+            arguments["file"],
+            arguments.get("offset", 0),
+            arguments.get("length", 65536),
+        )
+    elif name == "pve_agent_file_write":
+        content = arguments["content"]
+        data = base64.b64decode(content) if arguments.get("base64") else content.encode()
+        return write_file(
+            arguments["node"],
+            arguments["vmid"],
+            arguments["file"],
+            data,
+            arguments.get("timeout", 60),
+        )
+    elif name == "pve_agent_network":
+        return network_interfaces(arguments)
+    else:
+        raise ValueError(f"Unknown tool: {name}")
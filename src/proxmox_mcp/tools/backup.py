@@ -1,10 +1,18 @@
 """Backup and snapshot management tools."""
 
+import logging
+import threading
+import time
+from datetime import date
 from typing import Any
 
 from mcp.types import Tool
 
-from ..client import client
+from ..client import client, map_concurrent
+from ..ratelimit import Priority
+from .common import GUEST_SELECTOR_SCHEMA, STREAM_PROPERTIES, parse_disks
+
+logger = logging.getLogger(__name__)
 
 
 def get_tools() -> list[Tool]:
@@ -19,6 +27,7 @@ def get_tools() -> list[Tool]:
                 "properties": {
                     "node": {"type": "string", "description": "Node name"},
                     "storage": {"type": "string", "description": "Storage pool name"},
+                    **STREAM_PROPERTIES,
                 },
                 "required": ["node", "storage"],
             },
@@ -127,14 +136,204 @@ def get_tools() -> list[Tool]:
                 "required": ["node", "vmid", "name"],
             },
         ),
+        Tool(
+            name="pve_snapshot_prune",
+            description=(
+                "Apply a snapshot retention policy across many VMs/containers. "
+                "At least one keep_* value must be positive. "
+                "Dry run by default; set dry_run=false to delete. "
+                "WARNING: Pruned snapshots are permanently deleted!"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "selector": GUEST_SELECTOR_SCHEMA,
+                    "keep_last": {
+                        "type": "integer",
+                        "description": "Keep the N most recent snapshots",
+                        "default": 0,
+                    },
+                    "keep_daily": {
+                        "type": "integer",
+                        "description": "Keep the newest snapshot of each of the last N days",
+                        "default": 0,
+                    },
+                    "keep_weekly": {
+                        "type": "integer",
+                        "description": "Keep the newest snapshot of each of the last N ISO weeks",
+                        "default": 0,
+                    },
+                    "prefix": {
+                        "type": "string",
+                        "description": "Only manage snapshots whose name starts with this prefix",
+                    },
+                    "dry_run": {
+                        "type": "boolean",
+                        "description": "Only report what would be deleted",
+                        "default": True,
+                    },
+                    "storage_concurrency": {
+                        "type": "integer",
+                        "description": "Max concurrent deletions per storage (per node if local)",
+                        "default": 2,
+                        "minimum": 1,
+                    },
+                },
+                "required": ["selector"],
+            },
+        ),
     ]
 
 
+def _select_keep(
+    snapshots: list[dict[str, Any]], keep_last: int, keep_daily: int, keep_weekly: int
+) -> set[str]:
+    """Return the names of snapshots retained by the policy.
+
+    Rules are applied in order (last, daily, weekly); a period already covered
+    by a kept snapshot does not count against later rules.
+    """
+    ordered = sorted(snapshots, key=lambda s: s.get("snaptime", 0), reverse=True)
+
+    def day(snap):
+        return time.strftime("%Y-%m-%d", time.gmtime(snap.get("snaptime", 0)))
+
+    def week(snap):
+        iso = date(*time.gmtime(snap.get("snaptime", 0))[:3]).isocalendar()
+        return f"{iso[0]}-{iso[1]:02d}"
+
+    keep = {snap["name"] for snap in ordered[:keep_last]} if keep_last > 0 else set()
+    for count, period in ((keep_daily, day), (keep_weekly, week)):
+        if count <= 0:
+            continue
+        covered = {period(snap) for snap in ordered if snap["name"] in keep}
+        selected: set[str] = set()
+        for snap in ordered:
+            if snap["name"] in keep:
+                continue
+            key = period(snap)
+            if key in covered or key in selected:
+                continue
+            if len(selected) >= count:
+                break
+            selected.add(key)
+            keep.add(snap["name"])
+    return keep
+
+
+def prune_snapshots(
+    selector: dict[str, Any],
+    keep_last: int = 0,
+    keep_daily: int = 0,
+    keep_weekly: int = 0,
+    prefix: str | None = None,
+    dry_run: bool = True,
+    storage_concurrency: int = 2,
+) -> dict[str, Any]:
+    """Apply a retention policy to the snapshots of every selected guest."""
+    if max(keep_last, keep_daily, keep_weekly) <= 0:
+        raise ValueError(
+            "Retention policy keeps nothing: set keep_last, keep_daily or keep_weekly"
+        )
+    if storage_concurrency < 1:
+        raise ValueError("storage_concurrency must be at least 1")
+    guests = client.list_guests(selector)
+
+    def plan(guest):
+        snaps = client.list_snapshots(guest["node"], guest["vmid"], guest["type"])
+        managed = [
+            s for s in snaps
+            if s.get("name") != "current" and (not prefix or s["name"].startswith(prefix))
+        ]
+        keep = _select_keep(managed, keep_last, keep_daily, keep_weekly)
+        prune = [s["name"] for s in sorted(managed, key=lambda s: s.get("snaptime", 0))
+                 if s["name"] not in keep]
+        return sorted(keep), prune
+
+    reports = []
+    for guest, result, error in map_concurrent(plan, guests):
+        report = {"vmid": guest["vmid"], "node": guest["node"], "type": guest["type"]}
+        if error is not None:
+            report["error"] = str(error)
+        else:
+            report["keep"], report["prune"] = result
+        reports.append(report)
+
+    pending = [r for r in reports if r.get("prune")]
+    if not dry_run and pending:
+        # Node-local storages (local-lvm, local-zfs, ...) are separate pools on
+        # every node and get a limit each; shared storages are limited cluster-wide
+        shared = {s["storage"] for s in client.list_cluster_storage() if s.get("shared")}
+        semaphores: dict[tuple[str | None, str], threading.BoundedSemaphore] = {}
+        lock = threading.Lock()
+
+        def storage_semaphores(node, storages):
+            # Acquired in storage name order so concurrent guests cannot deadlock
+            keys = [(None if s in shared else node, s) for s in sorted(storages)]
+            with lock:
+                return [
+                    semaphores.setdefault(key, threading.BoundedSemaphore(storage_concurrency))
+                    for key in keys
+                ]
+
+        def execute(report):
+            # Deletions on one guest are serialized: PVE locks the guest config
+            # for the duration of each snapshot-delete task.
+            config = client.get_guest_config(report["node"], report["vmid"], report["type"])
+            disks = parse_disks(config).values()
+            held = storage_semaphores(
+                report["node"],
+                {d["storage"] for d in disks if "storage" in d and d.get("media") != "cdrom"},
+            )
+            report["deleted"], report["errors"] = [], {}
+            for name in report["prune"]:
+                for sem in held:
+                    sem.acquire()
+                try:
+                    upid = client.delete_snapshot(
+                        report["node"], report["vmid"], name, report["type"]
+                    )
+                    status = client.wait_for_task(report["node"], upid)
+                    if status.get("exitstatus", "OK") == "OK":
+                        report["deleted"].append(name)
+                    else:
+                        report["errors"][name] = status.get("exitstatus")
+                except Exception as e:
+                    logger.exception("Deleting snapshot %s of %s failed", name, report["vmid"])
+                    report["errors"][name] = str(e)
+                finally:
+                    for sem in reversed(held):
+                        sem.release()
+            if not report["errors"]:
+                del report["errors"]
+
+        for report, _, error in map_concurrent(execute, pending, priority=Priority.BACKGROUND):
+            if error is not None:
+                report["error"] = str(error)
+
+    summary = {
+        "guests": len(reports),
+        "keep": sum(len(r.get("keep", [])) for r in reports),
+        "prune": sum(len(r.get("prune", [])) for r in reports),
+        "failed_guests": sum(1 for r in reports if "error" in r),
+    }
+    if not dry_run:
+        summary["deleted"] = sum(len(r.get("deleted", [])) for r in reports)
+    return {
+        "dry_run": dry_run,
+        "summary": summary,
+        # Guests with nothing to prune are only counted, keeping the result small
+        "guests": [r for r in reports if r.get("prune") or "error" in r],
+    }
+
+
 def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
     """Handle backup/snapshot tool calls."""
     vm_type = arguments.get("type", "qemu")
 
     if name == "pve_backup_list":
+        if arguments.get("stream"):
+            return client.iter_backups(arguments["node"], arguments["storage"])
         return client.list_backups(arguments["node"], arguments["storage"])
     elif name == "pve_backup_create":
         node = arguments.pop("node")
@@ -161,5 +360,15 @@ def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
         return {"task": client.delete_snapshot(
             arguments["node"], arguments["vmid"], arguments["name"], vm_type
         )}
+    elif name == "pve_snapshot_prune":
+        return prune_snapshots(
+            arguments["selector"],
+            keep_last=arguments.get("keep_last", 0),
+            keep_daily=arguments.get("keep_daily", 0),
+            keep_weekly=arguments.get("keep_weekly", 0),
+            prefix=arguments.get("prefix"),
+            dry_run=arguments.get("dry_run", True),
+            storage_concurrency=arguments.get("storage_concurrency", 2),
+        )
     else:
         raise ValueError(f"Unknown tool: {name}")
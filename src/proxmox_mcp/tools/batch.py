@@ -0,0 +1,193 @@
+"""Batched read tools."""
+
+from typing import Any
+
+from mcp.types import Tool
+
+from ..client import client, map_concurrent
+from .common import GUEST_SELECTOR_SCHEMA
+
+# kind -> (operation, guest type or None for either)
+KINDS = {
+    "status": ("status", None),
+    "config": ("config", None),
+    "snapshots": ("snapshots", None),
+    "vm_status": ("status", "qemu"),
+    "vm_config": ("config", "qemu"),
+    "container_status": ("status", "lxc"),
+    "container_config": ("config", "lxc"),
+}
+
+
+def get_tools() -> list[Tool]:
+    """Return batched read tools."""
+    return [
+        Tool(
+            name="pve_batch_get",
+            description=(
+                "Fetch status, config or snapshots for many VMs/containers in one call. "
+                "Lookups run concurrently and are de-duplicated; returns a map keyed by "
+                "'<kind>:<vmid>' with per-item errors"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "requests": {
+                        "type": "array",
+                        "description": "Individual lookups",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "kind": {"type": "string", "enum": sorted(KINDS)},
+                                "vmid": {"type": "integer", "description": "VM/Container ID"},
+                                "node": {
+                                    "type": "string",
+                                    "description": "Node name (looked up if omitted)",
+                                },
+                                "type": {
+                                    "type": "string",
+                                    "description": "qemu or lxc (looked up if omitted)",
+                                    "enum": ["qemu", "lxc"],
+                                },
+                            },
+                            "required": ["kind", "vmid"],
+                        },
+                    },
+                    "selector": GUEST_SELECTOR_SCHEMA,
+                    "kinds": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": sorted(KINDS)},
+                        "description": "Kinds to fetch for every guest matched by selector",
+                        "default": ["status"],
+                    },
+                    "fields": {
+                        "description": (
+                            "Only return these fields: a list (applied to every result that "
+                            "has any of them) or a map of kind -> list, e.g. "
+                            "{\"status\": [\"status\"], \"config\": [\"memory\"]}"
+                        ),
+                        "anyOf": [
+                            {"type": "array", "items": {"type": "string"}},
+                            {
+                                "type": "object",
+                                "additionalProperties": {
+                                    "type": "array", "items": {"type": "string"},
+                                },
+                            },
+                        ],
+                    },
+                },
+                "required": [],
+            },
+        ),
+    ]
+
+
+def _fetch(key: tuple[str, str, str, int]) -> Any:
+    operation, vm_type, node, vmid = key
+    if operation == "snapshots":
+        return client.list_snapshots(node, vmid, vm_type)
+    if operation == "config":
+        return client.get_guest_config(node, vmid, vm_type)
+    if vm_type == "qemu":
+        return client.get_vm_status(node, vmid)
+    return client.get_container_status(node, vmid)
+
+
+def _resolve(
+    request: dict[str, Any], located: dict[int, dict[str, Any]]
+) -> tuple[str, str, str, int] | dict[str, str]:
+    """Return the lookup key of a request, or an error if it cannot be resolved."""
+    kind, vmid = request["kind"], request["vmid"]
+    if kind not in KINDS:
+        return {"error": f"Unknown kind: {kind}"}
+    operation, kind_type = KINDS[kind]
+    guest = located.get(vmid, {})
+    node = request.get("node") or guest.get("node")
+    actual_type = request.get("type") or guest.get("type")
+    if kind_type and actual_type and actual_type != kind_type:
+        return {"error": f"{vmid} is {actual_type}, not {kind_type}"}
+    vm_type = kind_type or actual_type
+    if not node or not vm_type:
+        return {"error": f"Guest {vmid} not found"}
+    return (operation, vm_type, node, vmid)
+
+
+def _project(result: Any, fields: list[str]) -> Any:
+    """Keep only fields of a result (or of each entry of a list result) that has any of them."""
+    if isinstance(result, list):
+        return [_project(item, fields) for item in result]
+    if not isinstance(result, dict) or "error" in result or not any(f in result for f in fields):
+        return result
+    return {f: result[f] for f in fields if f in result}
+
+
+def _fields_for(fields: list[str] | dict[str, list[str]] | None, kind: str) -> list[str] | None:
+    if isinstance(fields, dict):
+        # "status" also applies to vm_status/container_status unless given separately
+        return fields.get(kind, fields.get(KINDS[kind][0]))
+    return fields
+
+
+def batch_get(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Resolve, de-duplicate and concurrently execute batched lookups."""
+    requests = list(arguments.get("requests") or [])
+    if "selector" in arguments:
+        kinds = arguments.get("kinds") or ["status"]
+        for guest in client.list_guests(arguments["selector"]):
+            for kind in kinds:
+                requests.append({
+                    "kind": kind, "vmid": guest["vmid"],
+                    "node": guest["node"], "type": guest["type"],
+                })
+
+    # One cluster-wide lookup for every request that lacks node or type
+    located = {}
+    if any(not (r.get("node") and r.get("type")) for r in requests):
+        located = {g["vmid"]: g for g in client.list_guests()}
+
+    # label -> lookup key, or an error for requests that cannot be resolved
+    keys: dict[str, tuple[str, str, str, int] | dict[str, str]] = {}
+    conflicts: set[str] = set()
+    for request in requests:
+        label = f"{request['kind']}:{request['vmid']}"
+        key = _resolve(request, located)
+        if label in conflicts:
+            continue
+        if label in keys and keys[label] != key:
+            # The same kind and vmid requested with a different node or type
+            keys[label] = {"error": f"Conflicting duplicate requests for {label}"}
+            conflicts.add(label)
+        else:
+            keys[label] = key
+
+    fields = arguments.get("fields")
+    unique = {key for key in keys.values() if isinstance(key, tuple)}
+    fetched = {}
+    for key, result, error in map_concurrent(_fetch, unique):
+        fetched[key] = {"error": str(error)} if error is not None else result
+    results = {}
+    for label, key in keys.items():
+        if not isinstance(key, tuple):
+            results[label] = key
+            continue
+        kind_fields = _fields_for(fields, label.split(":", 1)[0])
+        results[label] = _project(fetched[key], kind_fields) if kind_fields else fetched[key]
+
+    errors = sum(1 for r in results.values() if isinstance(r, dict) and "error" in r)
+    return {
+        "summary": {
+            "requested": len(requests),
+            "fetched": len(unique),
+            "errors": errors,
+        },
+        "results": results,
+    }
+
+
+def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Handle batched read tool calls."""
+    if name == "pve_batch_get":
+        return batch_get(arguments)
+    else:
+        raise ValueError(f"Unknown tool: {name}")
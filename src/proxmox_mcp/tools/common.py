@@ -0,0 +1,91 @@
+"""Schema fragments and config parsing helpers shared by tool modules."""
+
+import re
+from typing import Any
+
+# Config keys that reference volumes, e.g. "scsi0: local-lvm:vm-100-disk-0,size=32G"
+DISK_KEY = re.compile(r"^(ide|sata|scsi|virtio|efidisk|tpmstate|unused|mp)\d+$|^rootfs$")
+
+GUEST_SELECTOR_SCHEMA = {
+    "type": "object",
+    "description": "Guest selector; all given criteria must match",
+    "properties": {
+        "node": {"type": "string", "description": "Only guests on this node"},
+        "type": {
+            "type": "string",
+            "description": "Only qemu (VMs) or lxc (containers)",
+            "enum": ["qemu", "lxc"],
+        },
+        "vmids": {
+            "type": "array",
+            "items": {"type": "integer"},
+            "description": "Only these VM/Container IDs",
+        },
+        "name": {"type": "string", "description": "Glob pattern on the guest name"},
+        "tag": {"type": "string", "description": "Only guests carrying this tag"},
+        "status": {"type": "string", "description": "Only guests in this state (e.g. running)"},
+    },
+}
+
+# Items returned by one chunked ("stream") response unless max_items is given
+STREAM_MAX_ITEMS = 10000
+
+# Optional properties of listing tools that support chunked ("stream") output
+STREAM_PROPERTIES = {
+    "stream": {
+        "type": "boolean",
+        "description": (
+            "Return the listing as several compact JSON chunks (in one response) with "
+            "progress notifications, ending with a summary holding next_offset"
+        ),
+        "default": False,
+    },
+    "chunk_size": {
+        "type": "integer",
+        "description": "Streaming: items per chunk",
+        "default": 500,
+        "minimum": 1,
+    },
+    "offset": {
+        "type": "integer",
+        "description": (
+            "Streaming: skip this many items (use next_offset to continue; "
+            "the listing is re-fetched for each page)"
+        ),
+        "default": 0,
+    },
+    "max_items": {
+        "type": "integer",
+        "description": "Streaming: stop after this many items",
+        "default": STREAM_MAX_ITEMS,
+        "minimum": 1,
+    },
+}
+
+
+def parse_options(value: str) -> dict[str, str]:
+    """Parse a "a=1,b=2" property string; bare tokens map to an empty string."""
+    options = {}
+    for part in value.split(","):
+        if "=" in part:
+            key, val = part.split("=", 1)
+            options[key] = val
+        elif part:
+            options[part] = ""
+    return options
+
+
+def parse_disks(config: dict[str, Any]) -> dict[str, dict[str, str]]:
+    """Parse disk and mount point entries into {key: {storage, volume, ...options}}."""
+    disks = {}
+    for key, value in config.items():
+        if not DISK_KEY.match(key) or not isinstance(value, str):
+            continue
+        volume, _, rest = value.partition(",")
+        disk = parse_options(rest)
+        if ":" in volume:
+            disk["storage"], disk["volume"] = volume.split(":", 1)
+        else:
+            disk["volume"] = volume
+        disks[key] = disk
+    return disks
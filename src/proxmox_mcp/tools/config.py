@@ -0,0 +1,300 @@
+"""Configuration diff and drift detection tools."""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from mcp.types import Tool
+
+from ..client import client, map_concurrent
+from .common import GUEST_SELECTOR_SCHEMA, parse_disks, parse_options
+
+# Config keys of network interfaces, e.g. "net0: virtio=BC:24:11:00:00:64,bridge=vmbr0"
+NIC_KEY = re.compile(r"^net\d+$")
+MAC = re.compile(r"^[0-9A-Fa-f]{2}(:[0-9A-Fa-f]{2}){5}$")
+
+# Keys that are unique per guest and would make every fingerprint different
+IDENTITY_KEYS = {
+    "digest", "name", "hostname", "vmgenid", "smbios1", "meta", "lock",
+    "description", "parent", "snaptime", "tags",
+}
+NIC_IDENTITY_KEYS = {"macaddr", "hwaddr", "ip", "ip6", "gw", "gw6"}
+
+# Configs fetched within max_age seconds are reused: (node, type, vmid) -> (time, config)
+_config_cache: "OrderedDict[tuple[str, str, int], tuple[float, dict[str, Any]]]" = OrderedDict()
+_config_cache_size = 4096
+_cache_lock = threading.Lock()
+
+
+def parse_nics(config: dict[str, Any]) -> dict[str, dict[str, str]]:
+    """Parse netN entries; the qemu "virtio=<mac>" form becomes model/macaddr."""
+    nics = {}
+    for key, value in config.items():
+        if not NIC_KEY.match(key) or not isinstance(value, str):
+            continue
+        nic = parse_options(value)
+        for opt, val in list(nic.items()):
+            if opt != "hwaddr" and MAC.match(val):
+                del nic[opt]
+                nic["model"], nic["macaddr"] = opt, val.upper()
+                break
+        nics[key] = nic
+    return nics
+
+
+def parse_cpu(config: dict[str, Any]) -> dict[str, Any]:
+    """Parse the qemu "cpu" property into a type and a sorted flag list."""
+    if "cpu" not in config:
+        return {}
+    cputype, _, rest = str(config["cpu"]).partition(",")
+    options = parse_options(rest)
+    if "=" in cputype:
+        options.update(parse_options(cputype))
+        cputype = options.pop("cputype", "")
+    cpu: dict[str, Any] = {"type": cputype, **options}
+    if "flags" in cpu:
+        cpu["flags"] = sorted(f for f in cpu["flags"].split(";") if f)
+    return cpu
+
+
+def normalize_config(config: dict[str, Any], include_identity: bool = False) -> dict[str, Any]:
+    """Split a raw guest config into disks, NICs, CPU and remaining options.
+
+    Unless include_identity is set, per-guest values (names, MAC/IP addresses,
+    volume names, digests) are dropped so that equivalent guests compare equal.
+    """
+    disks = parse_disks(config)
+    nics = parse_nics(config)
+    if not include_identity:
+        for disk in disks.values():
+            if disk.get("media") != "cdrom":
+                disk.pop("volume", None)
+        for nic in nics.values():
+            for key in NIC_IDENTITY_KEYS:
+                nic.pop(key, None)
+    options = {
+        key: value for key, value in config.items()
+        if key not in disks and key not in nics and key != "cpu"
+        and (include_identity or key not in IDENTITY_KEYS)
+    }
+    return {"disks": disks, "nics": nics, "cpu": parse_cpu(config), "options": options}
+
+
+def fingerprint(normalized: dict[str, Any]) -> str:
+    """Return a short stable hash of a normalized config."""
+    canonical = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def _flatten(normalized: dict[str, Any]) -> dict[str, Any]:
+    flat = {}
+    for section, entries in normalized.items():
+        for key, value in entries.items():
+            if isinstance(value, dict):
+                for sub, subvalue in value.items():
+                    flat[f"{section}.{key}.{sub}"] = subvalue
+            else:
+                flat[f"{section}.{key}"] = value
+    return flat
+
+
+def diff_normalized(a: dict[str, Any], b: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return the keys whose values differ between two normalized configs."""
+    flat_a, flat_b = _flatten(a), _flatten(b)
+    return [
+        {"key": key, "a": flat_a.get(key), "b": flat_b.get(key)}
+        for key in sorted(flat_a.keys() | flat_b.keys())
+        if flat_a.get(key) != flat_b.get(key)
+    ]
+
+
+def fetch_config(node: str, vmid: int, vm_type: str, max_age: float = 0) -> dict[str, Any]:
+    """Get a guest config, reusing a cached copy younger than max_age seconds."""
+    key = (node, vm_type, vmid)
+    now = time.monotonic()
+    if max_age > 0:
+        with _cache_lock:
+            cached = _config_cache.get(key)
+        if cached and now - cached[0] <= max_age:
+            return cached[1]
+    config = client.get_guest_config(node, vmid, vm_type)
+    with _cache_lock:
+        _config_cache[key] = (now, config)
+        _config_cache.move_to_end(key)
+        while len(_config_cache) > _config_cache_size:
+            _config_cache.popitem(last=False)
+    return config
+
+
+def _resolve(vmid: int, node: str | None, vm_type: str | None) -> tuple[str, str]:
+    if node and vm_type:
+        return node, vm_type
+    guest = client.locate_guest(vmid)
+    return node or guest["node"], vm_type or guest["type"]
+
+
+def config_diff(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Diff a guest against another guest or an inline baseline config."""
+    include_identity = arguments.get("include_identity", False)
+    max_age = arguments.get("max_age", 30)
+    vmid = arguments["vmid"]
+    node, vm_type = _resolve(vmid, arguments.get("node"), arguments.get("type"))
+    a = normalize_config(fetch_config(node, vmid, vm_type, max_age), include_identity)
+
+    if "baseline" in arguments:
+        other = "baseline"
+        b = normalize_config(arguments["baseline"], include_identity)
+    elif "other_vmid" in arguments:
+        other = arguments["other_vmid"]
+        other_node, other_type = _resolve(
+            other, arguments.get("other_node"), arguments.get("other_type")
+        )
+        b = normalize_config(fetch_config(other_node, other, other_type, max_age), include_identity)
+    else:
+        raise ValueError("Either other_vmid or baseline is required")
+
+    fp_a, fp_b = fingerprint(a), fingerprint(b)
+    return {
+        "a": {"vmid": vmid, "fingerprint": fp_a},
+        "b": {"vmid": other, "fingerprint": fp_b},
+        "identical": fp_a == fp_b,
+        "diff": [] if fp_a == fp_b else diff_normalized(a, b),
+    }
+
+
+def config_drift(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Group selected guests by config fingerprint and diff each group to a reference."""
+    max_age = arguments.get("max_age", 30)
+    baseline_vmid = arguments.get("baseline_vmid")
+    guests = client.list_guests(arguments.get("selector"))
+    if baseline_vmid is not None and all(g["vmid"] != baseline_vmid for g in guests):
+        guests.append(client.locate_guest(baseline_vmid))
+
+    def load(guest):
+        config = fetch_config(guest["node"], guest["vmid"], guest["type"], max_age)
+        normalized = normalize_config(config)
+        return fingerprint(normalized), normalized
+
+    groups: dict[str, dict[str, dict[str, Any]]] = {}
+    errors = {}
+    baseline_fp = {}
+    for guest, result, error in map_concurrent(load, guests):
+        if error is not None:
+            errors[guest["vmid"]] = str(error)
+            continue
+        fp, normalized = result
+        group = groups.setdefault(guest["type"], {}).setdefault(
+            fp, {"vmids": [], "config": normalized}
+        )
+        group["vmids"].append(guest["vmid"])
+        if guest["vmid"] == baseline_vmid:
+            baseline_fp[guest["type"]] = fp
+
+    report: dict[str, Any] = {"guests": len(guests), "types": {}}
+    for vm_type, by_fp in groups.items():
+        ref_fp = baseline_fp.get(vm_type) or max(by_fp, key=lambda fp: len(by_fp[fp]["vmids"]))
+        reference = by_fp[ref_fp]
+        report["types"][vm_type] = {
+            "groups": len(by_fp),
+            "reference": {"fingerprint": ref_fp, "vmids": sorted(reference["vmids"])},
+            "drift": [
+                {
+                    "fingerprint": fp,
+                    "vmids": sorted(group["vmids"]),
+                    "diff": diff_normalized(reference["config"], group["config"]),
+                }
+                for fp, group in sorted(by_fp.items(), key=lambda item: -len(item[1]["vmids"]))
+                if fp != ref_fp
+            ],
+        }
+    if errors:
+        report["errors"] = errors
+    return report
+
+
+def get_tools() -> list[Tool]:
+    """Return configuration comparison tools."""
+    return [
+        Tool(
+            name="pve_config_diff",
+            description=(
+                "Compare the configuration of a VM/container with another guest or with a "
+                "baseline config passed inline (baselines are not stored server-side). "
+                "Returns only the differing keys (disks, NICs, CPU, options)"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "vmid": {"type": "integer", "description": "VM/Container ID"},
+                    "node": {"type": "string", "description": "Node name (looked up if omitted)"},
+                    "type": {
+                        "type": "string",
+                        "description": "Type: qemu (VM) or lxc (container), looked up if omitted",
+                        "enum": ["qemu", "lxc"],
+                    },
+                    "other_vmid": {"type": "integer", "description": "VM/Container ID to compare"},
+                    "other_node": {"type": "string", "description": "Node of other_vmid"},
+                    "other_type": {
+                        "type": "string",
+                        "description": "Type of other_vmid",
+                        "enum": ["qemu", "lxc"],
+                    },
+                    "baseline": {
+                        "type": "object",
+                        "description": (
+                            "Inline baseline config (as returned by pve_vm_config) to compare"
+                        ),
+                    },
+                    "include_identity": {
+                        "type": "boolean",
+                        "description": "Also compare per-guest values (name, MACs, volume names)",
+                        "default": False,
+                    },
+                    "max_age": {
+                        "type": "number",
+                        "description": "Reuse configs fetched within this many seconds",
+                        "default": 30,
+                    },
+                },
+                "required": ["vmid"],
+            },
+        ),
+        Tool(
+            name="pve_config_drift",
+            description=(
+                "Detect configuration drift across many guests. Guests with identical "
+                "normalized configs are grouped by fingerprint; each group is diffed "
+                "against the reference (largest group or baseline_vmid)"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "selector": GUEST_SELECTOR_SCHEMA,
+                    "baseline_vmid": {
+                        "type": "integer",
+                        "description": "Use this guest's config as the reference",
+                    },
+                    "max_age": {
+                        "type": "number",
+                        "description": "Reuse configs fetched within this many seconds",
+                        "default": 30,
+                    },
+                },
+                "required": [],
+            },
+        ),
+    ]
+
+
+def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Handle configuration tool calls."""
+    if name == "pve_config_diff":
+        return config_diff(arguments)
+    elif name == "pve_config_drift":
+        return config_drift(arguments)
+    else:
+        raise ValueError(f"Unknown tool: {name}")
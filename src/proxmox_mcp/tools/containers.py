@@ -5,6 +5,7 @@ from typing import Any
 from mcp.types import Tool
 
 from ..client import client
+from .common import STREAM_PROPERTIES
 
 
 def get_tools() -> list[Tool]:
@@ -20,6 +21,7 @@ def get_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Optional: filter by node name",
                     },
+                    **STREAM_PROPERTIES,
                 },
                 "required": [],
             },
@@ -123,6 +125,8 @@ def get_tools() -> list[Tool]:
 def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
     """Handle container tool calls."""
     if name == "pve_container_list":
+        if arguments.get("stream"):
+            return client.iter_containers(arguments.get("node"))
         return client.list_containers(arguments.get("node"))
     elif name == "pve_container_status":
         return client.get_container_status(arguments["node"], arguments["vmid"])
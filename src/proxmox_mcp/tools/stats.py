@@ -0,0 +1,65 @@
+"""Server instrumentation tools."""
+
+from typing import Any
+
+from mcp.types import Tool
+
+from ..metrics import metrics
+from ..ratelimit import scheduler
+from ..tracing import tracer
+
+
+def get_tools() -> list[Tool]:
+    """Return server instrumentation tools."""
+    return [
+        Tool(
+            name="pve_server_stats",
+            description=(
+                "Latency histograms (p50/p95/p99), error counts and response sizes per MCP tool "
+                "and per Proxmox API endpoint, slowest first, plus rate limiter state"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "description": "json summary or prometheus text format",
+                        "enum": ["json", "prometheus"],
+                        "default": "json",
+                    },
+                    "top": {
+                        "type": "integer",
+                        "description": "Only return the N tools/endpoints with the most total time",
+                    },
+                    "slow_calls": {
+                        "type": "boolean",
+                        "description": "Include recent slow call traces (needs PROXMOX_MCP_TRACE)",
+                        "default": False,
+                    },
+                    "reset": {
+                        "type": "boolean",
+                        "description": "Clear all metrics after reading them",
+                        "default": False,
+                    },
+                },
+                "required": [],
+            },
+        ),
+    ]
+
+
+def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Handle instrumentation tool calls."""
+    if name == "pve_server_stats":
+        if arguments.get("format") == "prometheus":
+            result = {"prometheus": metrics.render_prometheus()}
+        else:
+            result = metrics.snapshot(arguments.get("top"))
+            result["scheduler"] = scheduler.stats()
+            if arguments.get("slow_calls"):
+                result["slow_calls"] = list(tracer.recent)
+        if arguments.get("reset"):
+            metrics.reset()
+        return result
+    else:
+        raise ValueError(f"Unknown tool: {name}")
@@ -1,10 +1,20 @@
 """Storage management tools."""
 
+import heapq
+import time
 from typing import Any
 
 from mcp.types import Tool
+from proxmoxer import ResourceException
 
-from ..client import client
+from ..client import client, map_concurrent
+from ..ratelimit import Priority
+from .common import STREAM_PROPERTIES
+
+# Content types holding guest disks; volumes of vmids that no longer exist are orphans
+DISK_CONTENT = {"images", "rootdir"}
+# Orphans listed per storage (all of them are counted)
+MAX_ORPHANS = 100
 
 
 def get_tools() -> list[Tool]:
@@ -32,18 +42,216 @@ def get_tools() -> list[Tool]:
                 "properties": {
                     "node": {"type": "string", "description": "Node name"},
                     "storage": {"type": "string", "description": "Storage pool name"},
+                    "content": {
+                        "type": "string",
+                        "description": "Optional: only this content type (images, rootdir, "
+                        "backup, iso, vztmpl)",
+                    },
+                    **STREAM_PROPERTIES,
                 },
                 "required": ["node", "storage"],
             },
         ),
+        Tool(
+            name="pve_storage_analytics",
+            description=(
+                "Analyze storage usage per storage and per node: usage by content type, "
+                "largest volumes, orphaned disks of deleted guests and a linear forecast "
+                "of when each storage fills up based on RRD history"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "node": {"type": "string", "description": "Optional: only this node"},
+                    "storage": {"type": "string", "description": "Optional: only this storage"},
+                    "top": {
+                        "type": "integer",
+                        "description": "Largest volumes to list per storage",
+                        "default": 10,
+                    },
+                    "timeframe": {
+                        "type": "string",
+                        "description": "RRD history used for the forecast",
+                        "enum": ["day", "week", "month", "year"],
+                        "default": "month",
+                    },
+                },
+                "required": [],
+            },
+        ),
     ]
 
 
+def scan_content(node: str, storage: str, top: int, vmids: set[int]) -> dict[str, Any]:
+    """Aggregate a storage listing in one pass without keeping the volumes."""
+    by_content: dict[str, dict[str, int]] = {}
+    largest: list[tuple[int, str, dict[str, Any]]] = []
+    orphans = []
+    orphan_count = orphan_size = volumes = 0
+    for volume in client.iter_storage_content(node, storage):
+        volumes += 1
+        size = volume.get("size") or 0
+        content = volume.get("content", "unknown")
+        totals = by_content.setdefault(content, {"count": 0, "size": 0})
+        totals["count"] += 1
+        totals["size"] += size
+        if top > 0 and (len(largest) < top or size > largest[0][0]):
+            entry = {"volid": volume["volid"], "content": content, "size": size}
+            if volume.get("vmid") is not None:
+                entry["vmid"] = int(volume["vmid"])
+            item = (size, volume["volid"], entry)
+            if len(largest) < top:
+                heapq.heappush(largest, item)
+            else:
+                heapq.heapreplace(largest, item)
+        vmid = volume.get("vmid")
+        if content in DISK_CONTENT and vmid is not None and int(vmid) not in vmids:
+            orphan_count += 1
+            orphan_size += size
+            if len(orphans) < MAX_ORPHANS:
+                orphans.append({"volid": volume["volid"], "vmid": int(vmid), "size": size})
+    return {
+        "volumes": volumes,
+        "by_content": dict(sorted(by_content.items())),
+        "largest": [entry for _, _, entry in sorted(largest, reverse=True)],
+        "orphans": {"count": orphan_count, "size": orphan_size, "volumes": orphans},
+    }
+
+
+def forecast(samples: list[dict[str, Any]], capacity: int = 0) -> dict[str, Any] | None:
+    """Fit used = a + b * time by least squares and extrapolate to full capacity."""
+    points = [
+        (s["time"], s["used"], s.get("total"))
+        for s in samples if s.get("used") is not None and s.get("time") is not None
+    ]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_t = sum(p[0] for p in points) / n
+    mean_u = sum(p[1] for p in points) / n
+    var_t = sum((p[0] - mean_t) ** 2 for p in points)
+    if not var_t:
+        return None
+    slope = sum((p[0] - mean_t) * (p[1] - mean_u) for p in points) / var_t
+    ss_tot = sum((p[1] - mean_u) ** 2 for p in points)
+    ss_res = sum((p[1] - (mean_u + slope * (p[0] - mean_t))) ** 2 for p in points)
+    last_time, used, total = points[-1]
+    total = total or capacity
+    result = {
+        "samples": n,
+        "growth_per_day": round(slope * 86400),
+        "r2": round(1 - ss_res / ss_tot, 3) if ss_tot else None,
+        "days_until_full": None,
+        "full_at": None,
+    }
+    if slope > 0 and total:
+        seconds = max(0.0, (total - used) / slope)
+        result["days_until_full"] = round(seconds / 86400, 1)
+        result["full_at"] = time.strftime("%Y-%m-%d", time.gmtime(last_time + seconds))
+    return result
+
+
+def storage_analytics(arguments: dict[str, Any]) -> dict[str, Any]:
+    """Scan storages concurrently and aggregate usage per storage and per node."""
+    top = arguments.get("top", 10)
+    timeframe = arguments.get("timeframe", "month")
+
+    # Shared storages appear once per node; scan each of them only once
+    pools: dict[tuple[str, str | None], dict[str, Any]] = {}
+    for resource in sorted(client.list_cluster_storage(), key=lambda r: (r["storage"], r["node"])):
+        if arguments.get("storage") and resource["storage"] != arguments["storage"]:
+            continue
+        if arguments.get("node") and resource["node"] != arguments["node"]:
+            continue
+        shared = bool(resource.get("shared"))
+        key = (resource["storage"], None if shared else resource["node"])
+        pool = pools.setdefault(key, {
+            "storage": resource["storage"],
+            "node": resource["node"],
+            "shared": shared,
+            "type": resource.get("plugintype"),
+            "status": resource.get("status"),
+            "total": resource.get("maxdisk") or 0,
+            "used": resource.get("disk") or 0,
+        })
+        if shared:
+            pool.setdefault("nodes", []).append(resource["node"])
+
+    vmids = {guest["vmid"] for guest in client.list_guests()}
+
+    def analyze(pool: dict[str, Any]) -> dict[str, Any]:
+        node, storage = pool["node"], pool["storage"]
+        result = scan_content(node, storage, top, vmids)
+        try:
+            result["forecast"] = forecast(
+                client.get_storage_rrddata(node, storage, timeframe), pool["total"]
+            )
+        except ResourceException as e:
+            # e.g. no RRD data for the storage yet; the content scan is still reported
+            result["forecast"] = {"error": str(e)}
+        return result
+
+    storages = []
+    nodes: dict[str, dict[str, Any]] = {}
+    for pool, result, error in map_concurrent(
+        analyze, list(pools.values()), priority=Priority.BACKGROUND
+    ):
+        entry = dict(pool)
+        entry["used_fraction"] = round(pool["used"] / pool["total"], 4) if pool["total"] else None
+        if error is not None:
+            entry["error"] = str(error)
+            storages.append(entry)
+            continue
+        entry.update(result)
+        storages.append(entry)
+        if pool["shared"]:
+            continue
+        totals = nodes.setdefault(pool["node"], {
+            "total": 0, "used": 0, "volumes": 0, "orphans": 0, "by_content": {},
+        })
+        totals["total"] += pool["total"]
+        totals["used"] += pool["used"]
+        totals["volumes"] += result["volumes"]
+        totals["orphans"] += result["orphans"]["count"]
+        for content, stats in result["by_content"].items():
+            node_stats = totals["by_content"].setdefault(content, {"count": 0, "size": 0})
+            node_stats["count"] += stats["count"]
+            node_stats["size"] += stats["size"]
+
+    scanned = [s for s in storages if "error" not in s]
+    soonest = min(
+        (s for s in scanned if s["forecast"] and s["forecast"].get("days_until_full") is not None),
+        key=lambda s: s["forecast"]["days_until_full"],
+        default=None,
+    )
+    return {
+        "summary": {
+            "storages": len(storages),
+            "errors": len(storages) - len(scanned),
+            "volumes": sum(s["volumes"] for s in scanned),
+            "orphans": sum(s["orphans"]["count"] for s in scanned),
+            "orphan_size": sum(s["orphans"]["size"] for s in scanned),
+            "first_full": {
+                "storage": soonest["storage"],
+                "node": soonest["node"],
+                "days_until_full": soonest["forecast"]["days_until_full"],
+            } if soonest else None,
+        },
+        "storages": storages,
+        "nodes": dict(sorted(nodes.items())),
+    }
+
+
 def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
     """Handle storage tool calls."""
     if name == "pve_storage_list":
         return client.list_storage(arguments.get("node"))
     elif name == "pve_storage_content":
-        return client.get_storage_content(arguments["node"], arguments["storage"])
+        items = client.iter_storage_content(
+            arguments["node"], arguments["storage"], arguments.get("content")
+        )
+        return items if arguments.get("stream") else list(items)
+    elif name == "pve_storage_analytics":
+        return storage_analytics(arguments)
     else:
         raise ValueError(f"Unknown tool: {name}")
@@ -5,6 +5,7 @@ from typing import Any
 from mcp.types import Tool
 
 from ..client import client
+from .common import STREAM_PROPERTIES
 
 
 def get_tools() -> list[Tool]:
@@ -20,6 +21,7 @@ def get_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Optional: filter by node name",
                     },
+                    **STREAM_PROPERTIES,
                 },
                 "required": [],
             },
@@ -150,6 +152,8 @@ def get_tools() -> list[Tool]:
 def handle_tool(name: str, arguments: dict[str, Any]) -> Any:
     """Handle VM tool calls."""
     if name == "pve_vm_list":
+        if arguments.get("stream"):
+            return client.iter_vms(arguments.get("node"))
         return client.list_vms(arguments.get("node"))
     elif name == "pve_vm_status":
         return client.get_vm_status(arguments["node"], arguments["vmid"])
@@ -0,0 +1,298 @@
+"""Opt-in per-call tracing, slow-call logging and sampling profiler hooks.
+
+Enabled with PROXMOX_MCP_TRACE=1. Each tool call gets a trace ID and spans for
+argument handling, the tool handler, every Proxmox API request and result
+serialization. Calls slower than PROXMOX_MCP_SLOW_MS are appended to the
+rotating JSONL file PROXMOX_MCP_SLOW_LOG and passed to registered hooks. With
+PROXMOX_MCP_PROFILE=1 the threads working for each call are sampled and the
+hottest stacks are attached to slow-call records.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import TYPE_CHECKING, Any
+
+from .metrics import normalize_path
+
+if TYPE_CHECKING:
+    from typing import Self
+
+_current: ContextVar[Trace | None] = ContextVar("proxmox_mcp_trace", default=None)
+
+# Arguments carrying payloads or secrets are recorded by size only
+REDACTED_ARGUMENTS = {
+    "pve_agent_exec": {"input_data"},
+    "pve_agent_file_write": {"content"},
+    "pve_container_create": {"password"},
+}
+
+
+class Span:
+    """A timed section of a trace; use as a context manager."""
+
+    __slots__ = ("attrs", "name", "start", "trace")
+
+    def __init__(self, trace: Trace, name: str, attrs: dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Self:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.trace.add_span(self.name, self.start, time.perf_counter() - self.start, **self.attrs)
+
+
+class Trace:
+    """Spans recorded while serving one tool call."""
+
+    def __init__(self, tool: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.tool = tool
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.spans: list[dict[str, Any]] = []
+        # Thread ident -> nesting depth, for threads currently working for this call
+        self.threads: Counter[int] = Counter()
+        self.samples: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, duration: float, **attrs: Any) -> None:
+        span = {
+            "name": name,
+            "offset_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            **attrs,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def enter_thread(self) -> None:
+        with self._lock:
+            self.threads[threading.get_ident()] += 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] -= 1
+            if self.threads[ident] <= 0:
+                del self.threads[ident]
+
+    def api_wall_time(self) -> float:
+        """Seconds during which at least one API request was in flight."""
+        intervals = sorted(
+            (s["offset_ms"], s["offset_ms"] + s["duration_ms"])
+            for s in self.spans if s["name"] == "request"
+        )
+        total, end = 0.0, float("-inf")
+        for lo, hi in intervals:
+            if hi > end:
+                total += hi - max(lo, end)
+                end = hi
+        return total / 1000
+
+    def to_dict(self, stacks: int = 20) -> dict[str, Any]:
+        requests = [s for s in self.spans if s["name"] == "request"]
+        api = self.api_wall_time()
+        record = {
+            "trace_id": self.id,
+            "tool": self.tool,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.started_at)),
+            "duration_ms": round(self.duration * 1000, 3),
+            "api_ms": round(api * 1000, 3),
+            "python_ms": round((self.duration - api) * 1000, 3),
+            "requests": len(requests),
+            "spans": self.spans,
+        }
+        with self._lock:
+            if self.samples:
+                record["profile"] = dict(self.samples.most_common(stacks))
+        return record
+
+
+class Profiler:
+    """Background sampler collecting folded stacks for the threads of active traces."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: set[Trace] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+
+    def attach(self, trace: Trace) -> None:
+        with self._lock:
+            self._active.add(trace)
+            self._wakeup.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def detach(self, trace: Trace) -> None:
+        with self._lock:
+            self._active.discard(trace)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            # Parked while no call is traced
+            with self._wakeup:
+                while not self._active:
+                    self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active)
+            frames = sys._current_frames()
+            for trace in active:
+                with trace._lock:
+                    idents = list(trace.threads)
+                for ident in idents:
+                    frame = frames.get(ident)
+                    if frame is None or ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                        frame = frame.f_back
+                    with trace._lock:
+                        trace.samples[";".join(reversed(stack))] += 1
+
+
+class Tracer:
+    """Creates traces for tool calls and reports the slow ones."""
+
+    def __init__(self):
+        self.enabled: bool | None = None
+        self.slow_seconds = 1.0
+        self.recent: deque[dict[str, Any]] = deque(maxlen=20)
+        self.hooks: list[Callable[[dict[str, Any]], None]] = []
+        self._log: logging.Logger | None = None
+        self._profiler: Profiler | None = None
+
+    def configure(self) -> None:
+        """(Re)read the PROXMOX_MCP_TRACE* / SLOW_* / PROFILE* environment variables."""
+        self.enabled = os.environ.get("PROXMOX_MCP_TRACE", "false").lower() in ("1", "true")
+        self.slow_seconds = float(os.environ.get("PROXMOX_MCP_SLOW_MS", "1000")) / 1000
+        self._log = None
+        path = os.environ.get("PROXMOX_MCP_SLOW_LOG")
+        if self.enabled and path:
+            self._log = logging.getLogger("proxmox_mcp.slowlog")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            for handler in list(self._log.handlers):
+                self._log.removeHandler(handler)
+                handler.close()
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=int(os.environ.get("PROXMOX_MCP_SLOW_LOG_MAX_BYTES", str(10 << 20))),
+                backupCount=int(os.environ.get("PROXMOX_MCP_SLOW_LOG_BACKUPS", "5")),
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+        profile = os.environ.get("PROXMOX_MCP_PROFILE", "false").lower() in ("1", "true")
+        interval = float(os.environ.get("PROXMOX_MCP_PROFILE_INTERVAL", "0.005"))
+        self._profiler = Profiler(interval) if self.enabled and profile else None
+
+    def add_hook(self, hook: Callable[[dict[str, Any]], None]) -> None:
+        """Call hook with the record of every slow call."""
+        self.hooks.append(hook)
+
+    def start(self, tool: str) -> Trace | None:
+        """Start tracing a tool call in the current context; None when disabled."""
+        if self.enabled is None:
+            self.configure()
+        if not self.enabled:
+            return None
+        trace = Trace(tool)
+        _current.set(trace)
+        if self._profiler:
+            self._profiler.attach(trace)
+        return trace
+
+    def finish(self, trace: Trace | None, error: str | None = None) -> None:
+        """End a trace and report it if it exceeded the slow-call threshold."""
+        if trace is None:
+            return
+        trace.duration = time.perf_counter() - trace.start
+        _current.set(None)
+        if self._profiler:
+            self._profiler.detach(trace)
+        if trace.duration < self.slow_seconds:
+            return
+        record = trace.to_dict()
+        if error:
+            record["error"] = error
+        self.recent.append(record)
+        if self._log:
+            self._log.info(json.dumps(record, default=str))
+        for hook in self.hooks:
+            hook(record)
+
+    def span(self, name: str, **attrs: Any) -> Span | nullcontext:
+        """Time a section of the current trace (no-op when not tracing)."""
+        trace = _current.get()
+        if trace is None:
+            return nullcontext()
+        return Span(trace, name, attrs)
+
+
+@contextmanager
+def thread_scope() -> Iterator[None]:
+    """Count the calling thread as working for the current trace (for profiling)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    trace.enter_thread()
+    try:
+        yield
+    finally:
+        trace.exit_thread()
+
+
+def redact_arguments(tool: str, arguments: dict[str, Any]) -> dict[str, Any]:
+    """Replace payload and secret arguments of a tool call with their size."""
+    hidden = REDACTED_ARGUMENTS.get(tool, ())
+    return {
+        key: f"<{len(str(value))} chars>" if key in hidden and value is not None else value
+        for key, value in arguments.items()
+    }
+
+
+def record_request(
+    method: str,
+    url: str,
+    status: int | None,
+    size: int,
+    start: float,
+    duration: float,
+    queued: float = 0.0,
+) -> None:
+    """Add an API request span to the current trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(
+            "request", start, duration,
+            method=method.upper(), path=normalize_path(url), url=url.split("/api2/json", 1)[-1],
+            status=status, bytes=size, queued_ms=round(queued * 1000, 3),
+        )
+
+
+# Global tracer
+tracer = Tracer()
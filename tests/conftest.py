@@ -0,0 +1,12 @@
+"""Shared fixtures: a simulated cluster behind the global client."""
+
+import pytest
+
+from proxmox_mcp.simulator import simulate
+
+
+@pytest.fixture
+def cluster():
+    """Point the global client at a small simulated cluster for one test."""
+    with simulate(nodes=3, vms=30, containers=10, snapshots=5, seed=0) as cluster:
+        yield cluster
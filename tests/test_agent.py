@@ -0,0 +1,63 @@
+"""Tests for guest agent tools."""
+
+import asyncio
+import json
+
+import pytest
+
+from proxmox_mcp.server import stream_result
+from proxmox_mcp.tools import agent
+
+
+def exec_calls(cluster):
+    return cluster.calls["POST /nodes/{node}/qemu/{vmid}/agent/exec"]
+
+
+def test_exec_aggregates_identical_results(cluster):
+    result = agent.handle_tool(
+        "pve_agent_exec", {"selector": {"vmids": [101, 104, 102]}, "command": ["echo", "hi"]}
+    )
+    assert result["summary"]["succeeded"] == 2
+    assert result["groups"][0] == {"vmids": [101, 104], "exitcode": 0, "out": "hi\n", "err": ""}
+    # 102 is stopped
+    assert result["groups"][1]["vmids"] == [102]
+    assert "not running" in result["groups"][1]["error"]
+
+
+def test_exec_timeout(cluster):
+    result = agent.handle_tool(
+        "pve_agent_exec", {"node": "pve2", "vmid": 101, "command": ["sleep", "5"], "timeout": 0.2}
+    )
+    assert result["timeout"] is True
+
+
+@pytest.mark.parametrize("option", [{"offset": 5}, {"max_items": 2}])
+def test_exec_stream_rejects_paging(cluster, option):
+    arguments = {"selector": {}, "command": ["hostname"], "stream": True, **option}
+    with pytest.raises(ValueError):
+        agent.handle_tool("pve_agent_exec", arguments)
+    assert exec_calls(cluster) == 0
+
+
+def test_exec_stream_returns_every_vm(cluster):
+    results = agent.handle_tool(
+        "pve_agent_exec", {"selector": {"status": "running"}, "command": ["hostname"],
+                           "stream": True}
+    )
+    *chunks, summary = [json.loads(c.text) for c in asyncio.run(stream_result(results, 1))]
+    assert summary["items"] == len(chunks) == exec_calls(cluster) == 20
+    assert summary["next_offset"] is None
+
+
+def test_file_write_in_chunks(cluster):
+    data = bytes(range(256)) * 1000
+    result = agent.write_file("pve2", 101, "/tmp/blob", data)
+    assert result["chunks"] == 6
+    assert cluster.guests[101]["files"] == {"/tmp/blob": data}
+
+
+def test_file_read_pages(cluster):
+    agent.write_file("pve2", 101, "/etc/motd", b"hello world")
+    page = agent.read_file("pve2", 101, "/etc/motd", offset=6, length=3)
+    assert page["content"] == "wor"
+    assert page["next_offset"] == 9
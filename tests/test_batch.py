@@ -0,0 +1,92 @@
+"""Tests for batched lookups (pve_batch_get)."""
+
+from proxmox_mcp.tools.batch import batch_get
+
+
+def test_duplicate_lookups_are_fetched_once(cluster):
+    result = batch_get({"requests": [
+        {"kind": "status", "vmid": 101},
+        {"kind": "vm_status", "vmid": 101},
+        {"kind": "config", "vmid": 101},
+    ]})
+    assert result["summary"] == {"requested": 3, "fetched": 2, "errors": 0}
+    assert cluster.calls["GET /nodes/{node}/qemu/{vmid}/status/current"] == 1
+    assert cluster.calls["GET /nodes/{node}/qemu/{vmid}/config"] == 1
+    # Node/type were looked up with a single cluster-wide call
+    assert cluster.calls["GET /cluster/resources"] == 1
+
+
+def test_results_keep_request_order(cluster):
+    requests = [{"kind": "status", "vmid": vmid} for vmid in (120, 101, 135, 110)]
+    result = batch_get({"requests": requests})
+    assert list(result["results"]) == ["status:120", "status:101", "status:135", "status:110"]
+
+
+def test_per_item_errors(cluster):
+    result = batch_get({"requests": [
+        {"kind": "status", "vmid": 101},
+        {"kind": "status", "vmid": 99999},
+        {"kind": "bogus", "vmid": 101},
+        {"kind": "status", "vmid": 102, "node": "pve1", "type": "qemu"},
+    ]})
+    results = result["results"]
+    assert results["status:101"]["status"] in ("running", "stopped")
+    assert results["status:99999"] == {"error": "Guest 99999 not found"}
+    assert results["bogus:101"] == {"error": "Unknown kind: bogus"}
+    assert "does not exist" in results["status:102"]["error"]
+    assert result["summary"]["errors"] == 3
+
+
+def test_selector_with_kinds(cluster):
+    result = batch_get({"selector": {"vmids": [101, 131]}, "kinds": ["status", "config"]})
+    assert set(result["results"]) == {"status:101", "config:101", "status:131", "config:131"}
+    assert result["results"]["config:131"]["hostname"] == "ct-131"
+
+
+def test_fields_only_project_results_that_have_them(cluster):
+    result = batch_get({
+        "selector": {"vmids": [101]}, "kinds": ["status", "config"], "fields": ["status"],
+    })
+    assert result["results"]["status:101"] == {"status": "running"}
+    assert result["results"]["config:101"]["name"] == "vm-101"
+
+
+def test_fields_per_kind(cluster):
+    result = batch_get({
+        "requests": [
+            {"kind": "vm_status", "vmid": 101},
+            {"kind": "config", "vmid": 101},
+            {"kind": "snapshots", "vmid": 101},
+        ],
+        "fields": {"status": ["status"], "config": ["memory", "cores"], "snapshots": ["name"]},
+    })
+    results = result["results"]
+    assert results["vm_status:101"] == {"status": "running"}
+    assert results["config:101"] == {"memory": 2048, "cores": 2}
+    assert results["snapshots:101"][0] == {"name": "auto-0"}
+
+
+def test_conflicting_duplicates_are_reported(cluster):
+    result = batch_get({"requests": [
+        {"kind": "status", "vmid": 101, "node": "pve2", "type": "qemu"},
+        {"kind": "status", "vmid": 101, "node": "pve1", "type": "qemu"},
+        {"kind": "status", "vmid": 104},
+        {"kind": "status", "vmid": 104},
+    ]})
+    assert result["results"]["status:101"] == {
+        "error": "Conflicting duplicate requests for status:101"
+    }
+    assert result["results"]["status:104"]["vmid"] == 104
+    assert result["summary"]["errors"] == 1
+
+
+def test_typed_kinds_reject_guests_of_the_other_type(cluster):
+    result = batch_get({"selector": {"vmids": [101, 131]}, "kinds": ["vm_status"]})
+    results = result["results"]
+    assert results["vm_status:101"]["vmid"] == 101
+    assert results["vm_status:131"] == {"error": "131 is lxc, not qemu"}
+    assert result["summary"]["errors"] == 1
+
+    result = batch_get({"requests": [{"kind": "container_config", "vmid": 101}]})
+    assert result["results"]["container_config:101"] == {"error": "101 is qemu, not lxc"}
+    assert not any("/lxc/" in key for key in cluster.calls)
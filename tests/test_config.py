@@ -0,0 +1,52 @@
+"""Tests for config diff and drift detection."""
+
+from proxmox_mcp.tools.common import parse_disks
+from proxmox_mcp.tools.config import config_diff, config_drift, normalize_config
+
+
+def test_parse_disks():
+    disks = parse_disks({
+        "scsi0": "local-lvm:vm-100-disk-0,iothread=1,size=32G",
+        "ide2": "none,media=cdrom",
+        "memory": 2048,
+    })
+    assert disks["scsi0"] == {
+        "storage": "local-lvm", "volume": "vm-100-disk-0", "iothread": "1", "size": "32G",
+    }
+    assert disks["ide2"] == {"volume": "none", "media": "cdrom"}
+
+
+def test_normalize_ignores_identity():
+    a = {"name": "a", "net0": "virtio=BC:24:11:00:00:01,bridge=vmbr0", "memory": 2048}
+    b = {"name": "b", "net0": "virtio=BC:24:11:00:00:02,bridge=vmbr0", "memory": 2048}
+    assert normalize_config(a) == normalize_config(b)
+    assert normalize_config(a, include_identity=True) != normalize_config(b, include_identity=True)
+
+
+def test_diff_reports_only_differences(cluster):
+    result = config_diff({"vmid": 101, "other_vmid": 110})
+    assert not result["identical"]
+    assert result["diff"] == [{"key": "options.memory", "a": 2048, "b": 4096}]
+
+
+def test_diff_against_inline_baseline(cluster):
+    baseline = dict(cluster.guests[101]["config"], cores=8)
+    result = config_diff({"vmid": 101, "baseline": baseline})
+    assert result["diff"] == [{"key": "options.cores", "a": 2, "b": 8}]
+
+
+def test_drift_groups_by_fingerprint(cluster):
+    cluster.guests[105]["config"]["cores"] = 4
+    report = config_drift({"selector": {"type": "qemu"}, "max_age": 0})
+    qemu = report["types"]["qemu"]
+    # Every 10th VM has 4 GiB memory; 105 has more cores; the rest are identical
+    assert qemu["groups"] == 3
+    assert len(qemu["reference"]["vmids"]) == 26
+    drift = {tuple(group["vmids"]): group["diff"] for group in qemu["drift"]}
+    assert drift[(100, 110, 120)] == [{"key": "options.memory", "a": 2048, "b": 4096}]
+    assert drift[(105,)] == [{"key": "options.cores", "a": 2, "b": 4}]
+
+
+def test_drift_uses_baseline_vmid_as_reference(cluster):
+    report = config_drift({"selector": {"type": "qemu"}, "baseline_vmid": 110, "max_age": 0})
+    assert report["types"]["qemu"]["reference"]["vmids"] == [100, 110, 120]
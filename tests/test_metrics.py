@@ -0,0 +1,69 @@
+"""Tests for path normalisation, histograms and the Prometheus exposition."""
+
+import pytest
+
+from proxmox_mcp.metrics import BUCKETS, Histogram, Metrics, normalize_path
+
+
+@pytest.mark.parametrize("url, path", [
+    ("https://pve:8006/api2/json/nodes/pve1/qemu/100/config", "/nodes/{node}/qemu/{vmid}/config"),
+    ("/nodes/pve1/lxc/130/snapshot/auto-0/rollback",
+     "/nodes/{node}/lxc/{vmid}/snapshot/{snapname}/rollback"),
+    ("/nodes/pve1/tasks/UPID:pve1:00001:vzdump::root@pam:/status",
+     "/nodes/{node}/tasks/{upid}/status"),
+    ("/nodes/pve1/storage/local/content", "/nodes/{node}/storage/{storage}/content"),
+    ("/nodes/pve1/storage/local/content/local:iso/x.iso",
+     "/nodes/{node}/storage/{storage}/content/{volume}"),
+    ("/cluster/resources?type=vm", "/cluster/resources"),
+])
+def test_normalize_path(url, path):
+    assert normalize_path(url) == path
+
+
+def test_quantile_interpolates_within_bucket():
+    h = Histogram()
+    for value in [0.011] * 9 + [0.02, 0.024]:  # all in bucket (0.01, 0.025]
+        h.observe(value)
+    assert h.quantile(0.5) == pytest.approx(0.0175)
+    # Never beyond the largest observation
+    assert h.quantile(1.0) == pytest.approx(0.024)
+
+
+def test_quantile_of_empty_histogram():
+    assert Histogram().quantile(0.99) == 0.0
+
+
+def test_quantile_overflow_bucket_uses_max():
+    h = Histogram()
+    h.observe(0.002)
+    h.observe(60.0)
+    assert h.quantile(0.99) <= 60.0
+    assert h.quantile(0.99) > BUCKETS[-1]
+
+
+def test_render_prometheus_buckets_are_cumulative():
+    m = Metrics()
+    for seconds in (0.002, 0.002, 0.3, 45.0):
+        m.record_tool("pve_vm_list", seconds, 100)
+    m.record_tool("pve_vm_list", 0.002, 10, error="ValueError")
+    lines = m.render_prometheus().splitlines()
+
+    bucket = "proxmox_mcp_tool_duration_seconds_bucket"
+    buckets = [line for line in lines if line.startswith(bucket)]
+    assert len(buckets) == len(BUCKETS) + 1
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert 'le="0.0025"} 3' in buckets[BUCKETS.index(0.0025)]
+    assert 'le="30.0"} 4' in buckets[-2]
+    assert buckets[-1] == bucket + '{tool="pve_vm_list",le="+Inf"} 5'
+    assert 'proxmox_mcp_tool_duration_seconds_count{tool="pve_vm_list"} 5' in lines
+    assert 'proxmox_mcp_tool_errors_total{tool="pve_vm_list"} 1' in lines
+    assert 'proxmox_mcp_tool_response_bytes_total{tool="pve_vm_list"} 410' in lines
+
+
+def test_render_prometheus_escapes_labels():
+    m = Metrics()
+    m.record_request("get", '/nodes/pve1/storage/a"b/status', 0.01, 1)
+    assert 'method="GET",path="/nodes/{node}/storage/{storage}/status"' in m.render_prometheus()
+    m.record_tool('odd"name', 0.01, 1)
+    assert 'tool="odd\\"name"' in m.render_prometheus()
@@ -0,0 +1,122 @@
+"""Tests for snapshot retention (pve_snapshot_prune)."""
+
+import calendar
+import threading
+from datetime import datetime
+
+import pytest
+
+from proxmox_mcp.client import client
+from proxmox_mcp.simulator import simulate
+from proxmox_mcp.tools.backup import _select_keep, prune_snapshots
+
+DAY = 86400
+
+
+def snap(name, when):
+    return {"name": name, "snaptime": calendar.timegm(when.timetuple())}
+
+
+def hourly(days=10, per_day=3):
+    """per_day snapshots on each of the last days, newest first in name order."""
+    snaps = []
+    for d in range(days):
+        for h in range(per_day):
+            snaps.append(snap(f"d{d}h{h}", datetime(2026, 3, 20 - d, 6 * (h + 1))))
+    return snaps
+
+
+def test_keep_last():
+    assert _select_keep(hourly(), 2, 0, 0) == {"d0h2", "d0h1"}
+
+
+def test_keep_daily_takes_newest_per_day():
+    assert _select_keep(hourly(), 0, 3, 0) == {"d0h2", "d1h2", "d2h2"}
+
+
+def test_rules_skip_periods_already_covered():
+    # keep_last covers day 0, so keep_daily=2 adds days 1 and 2
+    assert _select_keep(hourly(), 1, 2, 0) == {"d0h2", "d1h2", "d2h2"}
+
+
+def test_keep_weekly():
+    # 2026-03-20 is a Friday: days 0-4 are ISO week 12, days 5-9 week 11
+    assert _select_keep(hourly(), 0, 0, 2) == {"d0h2", "d5h2"}
+
+
+def test_dry_run_plans_without_deleting(cluster):
+    result = prune_snapshots({"vmids": [101]}, keep_last=2)
+    [guest] = result["guests"]
+    assert guest["keep"] == ["auto-3", "auto-4"]
+    assert guest["prune"] == ["auto-0", "auto-1", "auto-2"]
+    assert len(cluster.guests[101]["snapshots"]) == 5
+    assert not any(key.startswith("DELETE") for key in cluster.calls)
+
+
+def test_execute_deletes_pruned_snapshots(cluster):
+    result = prune_snapshots({"vmids": [101, 102]}, keep_last=1, dry_run=False)
+    assert result["summary"]["deleted"] == 8
+    for vmid in (101, 102):
+        assert [s["name"] for s in cluster.guests[vmid]["snapshots"]] == ["auto-4"]
+
+
+def test_prefix_limits_managed_snapshots(cluster):
+    result = prune_snapshots({"vmids": [101]}, keep_last=1, prefix="manual-")
+    assert result["summary"]["prune"] == 0
+
+
+@pytest.mark.parametrize("policy", [{}, {"keep_last": 0, "keep_daily": 0, "keep_weekly": 0}])
+def test_empty_policy_is_rejected(cluster, policy):
+    with pytest.raises(ValueError):
+        prune_snapshots({}, dry_run=False, **policy)
+    assert all(len(g["snapshots"]) == 5 for g in cluster.guests.values())
+
+
+def test_storage_concurrency_must_be_positive(cluster):
+    with pytest.raises(ValueError):
+        prune_snapshots({"vmids": [101]}, keep_last=1, dry_run=False, storage_concurrency=0)
+
+
+
+def track_tasks(monkeypatch):
+    """Record the peak number of snapshot deletions in flight, per node and in total."""
+    active: dict[str, int] = {}
+    peaks: dict[str, int] = {}
+    lock = threading.Lock()
+    wait_for_task = client.wait_for_task
+
+    def tracked(node, upid, *args, **kwargs):
+        with lock:
+            active[node] = active.get(node, 0) + 1
+            peaks[node] = max(peaks.get(node, 0), active[node])
+            peaks["total"] = max(peaks.get("total", 0), sum(active.values()))
+        try:
+            return wait_for_task(node, upid, *args, **kwargs)
+        finally:
+            with lock:
+                active[node] -= 1
+
+    monkeypatch.setattr(client, "wait_for_task", tracked)
+    return peaks
+
+
+def test_local_storage_limits_are_per_node(monkeypatch):
+    # Every guest has its disk on local-lvm, which is a separate pool on each node
+    peaks = track_tasks(monkeypatch)
+    with simulate(nodes=4, vms=8, containers=0, snapshots=2, task_duration=0.2):
+        result = prune_snapshots({}, keep_last=1, dry_run=False, storage_concurrency=1)
+    assert result["summary"]["deleted"] == 8
+    assert all(peaks[node] == 1 for node in ("pve1", "pve2", "pve3", "pve4"))
+    assert peaks["total"] > 1
+
+
+def test_shared_storage_limit_is_cluster_wide(monkeypatch):
+    peaks = track_tasks(monkeypatch)
+    list_cluster_storage = client.list_cluster_storage
+    monkeypatch.setattr(client, "list_cluster_storage", lambda: [
+        dict(s, shared=1) if s["storage"] == "local-lvm" else s for s in list_cluster_storage()
+    ])
+    with simulate(nodes=4, vms=8, containers=0, snapshots=2, task_duration=0.1):
+        result = prune_snapshots({}, keep_last=1, dry_run=False, storage_concurrency=1)
+    assert result["summary"]["deleted"] == 8
+    assert peaks["total"] == 1
@@ -0,0 +1,83 @@
+"""Tests for the request scheduler."""
+
+import threading
+import time
+
+from proxmox_mcp.ratelimit import Priority, Scheduler, node_of
+
+
+def run_requests(scheduler, count, node=None, hold=0.02):
+    """Issue count concurrent requests; return the peak number in flight."""
+    in_flight = peak = 0
+    lock = threading.Lock()
+
+    def request():
+        nonlocal in_flight, peak
+        scheduler.acquire(node)
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(hold)
+        with lock:
+            in_flight -= 1
+        scheduler.release(node)
+
+    threads = [threading.Thread(target=request) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return peak
+
+
+def test_node_of():
+    assert node_of("https://h:8006/api2/json/nodes/pve1/qemu/100/config") == "pve1"
+    assert node_of("https://h:8006/api2/json/cluster/resources") is None
+
+
+def test_cluster_concurrency_limit():
+    scheduler = Scheduler()
+    scheduler.configure(rate=0, max_concurrent=3, node_rate=0, node_max_concurrent=0)
+    assert run_requests(scheduler, 12) == 3
+    assert scheduler.stats()["cluster"]["in_flight"] == 0
+
+
+def test_node_concurrency_limit():
+    scheduler = Scheduler()
+    scheduler.configure(rate=0, max_concurrent=10, node_rate=0, node_max_concurrent=2)
+    assert run_requests(scheduler, 8, node="pve1") == 2
+
+
+def test_rate_limit():
+    scheduler = Scheduler()
+    scheduler.configure(rate=50, burst=1, max_concurrent=0, node_rate=0, node_max_concurrent=0)
+    start = time.monotonic()
+    run_requests(scheduler, 11, hold=0)
+    # One token up front, then 10 more at 50/s
+    assert time.monotonic() - start >= 0.18
+
+
+def test_interactive_requests_go_first():
+    scheduler = Scheduler()
+    scheduler.configure(rate=0, max_concurrent=1, node_rate=0, node_max_concurrent=0)
+    scheduler.acquire(priority=Priority.INTERACTIVE)
+    order = []
+
+    def request(priority):
+        scheduler.acquire(priority=priority)
+        order.append(priority)
+        scheduler.release()
+
+    def wait_queued(count):
+        while scheduler.stats()["queued"] < count:
+            time.sleep(0.001)
+
+    threads = []
+    for i, priority in enumerate([Priority.BACKGROUND, Priority.BULK, Priority.INTERACTIVE]):
+        threads.append(threading.Thread(target=request, args=(priority,)))
+        threads[-1].start()
+        wait_queued(i + 1)
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == [Priority.INTERACTIVE, Priority.BULK, Priority.BACKGROUND]
@@ -0,0 +1,56 @@
+"""Tests for tool dispatch in the MCP server."""
+
+import asyncio
+import json
+import time
+
+import pytest
+from mcp import types
+
+from proxmox_mcp.ratelimit import scheduler
+from proxmox_mcp.server import server
+from proxmox_mcp.simulator import simulate
+
+
+async def call(name, arguments):
+    handler = server.request_handlers[types.CallToolRequest]
+    request = types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments)
+    )
+    result = (await handler(request)).root
+    return json.loads(result.content[0].text)
+
+
+@pytest.fixture
+def limited():
+    scheduler.configure(rate=0, max_concurrent=2, node_rate=0, node_max_concurrent=0)
+    yield
+    scheduler.configure()
+
+
+def test_interactive_call_overtakes_bulk_sweep(limited):
+    async def run():
+        start = time.perf_counter()
+
+        async def sweep():
+            result = await call("pve_batch_get", {"selector": {}, "kinds": ["status"]})
+            assert result["summary"]["errors"] == 0
+            return time.perf_counter() - start
+
+        async def single():
+            await asyncio.sleep(0.05)
+            result = await call("pve_vm_status", {"node": "pve2", "vmid": 101})
+            assert result["vmid"] == 101
+            return time.perf_counter() - start
+
+        return await asyncio.gather(sweep(), single())
+
+    with simulate(vms=100, containers=0, latency=0.01):
+        sweep_done, single_done = asyncio.run(run())
+    # The sweep needs ~0.5s with two request slots; the status call must not wait for it
+    assert single_done < sweep_done / 2
+
+
+def test_errors_are_returned_as_results(cluster):
+    result = asyncio.run(call("pve_vm_status", {"node": "pve1", "vmid": 99999}))
+    assert "does not exist" in result["error"]
@@ -0,0 +1,113 @@
+"""Tests for storage analytics (pve_storage_analytics)."""
+
+from collections import Counter
+
+import pytest
+
+from proxmox_mcp.client import client
+from proxmox_mcp.tools.storage import forecast, scan_content, storage_analytics
+
+DAY = 86400
+
+
+def guest_vmids():
+    return {guest["vmid"] for guest in client.list_guests()}
+
+
+def test_totals_per_content_type(cluster):
+    volumes = list(client.iter_storage_content("pve1", "local"))
+    counts = Counter(v["content"] for v in volumes)
+    sizes = Counter()
+    for v in volumes:
+        sizes[v["content"]] += v["size"]
+
+    result = scan_content("pve1", "local", 5, guest_vmids())
+    assert result["volumes"] == len(volumes)
+    assert result["by_content"] == {
+        content: {"count": counts[content], "size": sizes[content]} for content in sorted(counts)
+    }
+    assert result["by_content"]["iso"]["count"] == 1
+
+
+def test_largest_volumes_in_descending_order(cluster):
+    sizes = sorted((v["size"] for v in client.iter_storage_content("pve2", "local-lvm")),
+                   reverse=True)
+    result = scan_content("pve2", "local-lvm", 4, guest_vmids())
+    assert [v["size"] for v in result["largest"]] == sizes[:4]
+    assert scan_content("pve2", "local-lvm", 0, guest_vmids())["largest"] == []
+
+
+def test_volumes_of_missing_guests_are_orphans(cluster):
+    result = storage_analytics({})
+    assert result["summary"]["orphans"] == 3
+    for entry in result["storages"]:
+        orphans = entry["orphans"]["volumes"]
+        if entry["storage"] != "local-lvm":
+            assert orphans == []
+            continue
+        orphan = 990000 + ["pve1", "pve2", "pve3"].index(entry["node"])
+        assert orphans == [
+            {"volid": f"local-lvm:vm-{orphan}-disk-0", "vmid": orphan, "size": 16 << 30}
+        ]
+    assert result["nodes"]["pve1"]["orphans"] == 1
+
+
+def test_shared_storage_is_scanned_once(cluster, monkeypatch):
+    list_cluster_storage = client.list_cluster_storage
+    monkeypatch.setattr(client, "list_cluster_storage", lambda: [
+        dict(s, shared=1) if s["storage"] == "local" else s for s in list_cluster_storage()
+    ])
+    result = storage_analytics({})
+    shared = [s for s in result["storages"] if s["storage"] == "local"]
+    assert len(shared) == 1
+    assert shared[0]["shared"] is True
+    assert shared[0]["nodes"] == ["pve1", "pve2", "pve3"]
+    assert result["summary"]["storages"] == 4
+    assert cluster.calls["GET /nodes/{node}/storage/{storage}/content"] == 4
+    # Shared pools are not attributed to any single node
+    assert all("backup" not in totals["by_content"] for totals in result["nodes"].values())
+
+
+def test_forecast_extrapolates_linear_growth():
+    samples = [{"time": d * DAY, "used": 1000 + 50 * d, "total": 2000} for d in range(10)]
+    result = forecast(samples)
+    assert result["samples"] == 10
+    assert result["growth_per_day"] == 50
+    assert result["r2"] == 1.0
+    # 550 left at 50 per day after the last sample (day 9)
+    assert result["days_until_full"] == 11.0
+    assert result["full_at"] == "1970-01-21"
+
+
+def test_forecast_uses_capacity_without_totals():
+    samples = [{"time": d * DAY, "used": 100 * d} for d in range(5)]
+    assert forecast(samples, capacity=1000)["days_until_full"] == 6.0
+    assert forecast(samples)["days_until_full"] is None
+
+
+def test_forecast_without_growth_never_fills():
+    samples = [{"time": d * DAY, "used": 500, "total": 1000} for d in range(5)]
+    result = forecast(samples)
+    assert result["growth_per_day"] == 0
+    assert result["days_until_full"] is None
+
+
+@pytest.mark.parametrize("samples", [
+    [],
+    [{"time": 0, "used": 10}],
+    [{"time": 0, "used": 10}, {"time": DAY}],
+    [{"time": DAY, "used": 10}, {"time": DAY, "used": 20}],
+])
+def test_forecast_needs_two_distinct_times(samples):
+    assert forecast(samples) is None
+
+
+
+def test_forecast_errors_do_not_fail_the_scan(cluster, monkeypatch):
+    get_storage_rrddata = client.get_storage_rrddata
+    # The simulator answers rrddata of an unknown storage with an API error
+    monkeypatch.setattr(client, "get_storage_rrddata",
+                        lambda node, storage, *args: get_storage_rrddata(node, "missing", *args))
+    [entry] = storage_analytics({"node": "pve1", "storage": "local"})["storages"]
+    assert "does not exist" in entry["forecast"]["error"]
+    assert entry["volumes"] == 16
@@ -0,0 +1,53 @@
+"""Tests for chunked listing output."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from proxmox_mcp.server import stream_result
+
+
+def chunks(items, **options):
+    return [json.loads(c.text) for c in asyncio.run(stream_result(iter(items), **options))]
+
+
+def test_chunks_and_summary():
+    *data, summary = chunks(range(7), chunk_size=3)
+    assert data == [[0, 1, 2], [3, 4, 5], [6]]
+    assert summary == {"items": 7, "offset": 0, "next_offset": None}
+
+
+def test_offset_and_max_items_page_through():
+    *data, summary = chunks(range(10), chunk_size=3, offset=2, max_items=4)
+    assert data == [[2, 3, 4], [5]]
+    assert summary == {"items": 4, "offset": 2, "next_offset": 6}
+
+
+def test_max_items_must_be_positive():
+    with pytest.raises(ValueError):
+        chunks(range(3), max_items=0)
+
+
+def test_storage_content_stream(cluster):
+    from proxmox_mcp.tools import storage
+
+    items = storage.handle_tool(
+        "pve_storage_content", {"node": "pve1", "storage": "local", "stream": True}
+    )
+    *data, summary = [json.loads(c.text) for c in asyncio.run(stream_result(items, chunk_size=4))]
+    assert summary["items"] == sum(len(chunk) for chunk in data) == 16
+
+
+def test_generator_is_closed_off_the_event_loop():
+    closed_in = []
+
+    def listing():
+        try:
+            yield from range(10)
+        finally:
+            closed_in.append(threading.get_ident())
+
+    asyncio.run(stream_result(listing(), max_items=3))
+    assert closed_in and closed_in[0] != threading.get_ident()
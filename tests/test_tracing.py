@@ -0,0 +1,137 @@
+"""Tests for call tracing, the slow-call log and the sampling profiler."""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+
+import pytest
+from mcp import types
+
+from proxmox_mcp.client import map_concurrent
+from proxmox_mcp.server import server
+from proxmox_mcp.simulator import simulate
+from proxmox_mcp.tracing import Trace, redact_arguments, thread_scope, tracer
+
+
+async def call(name, arguments):
+    handler = server.request_handlers[types.CallToolRequest]
+    request = types.CallToolRequest(
+        method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments)
+    )
+    result = (await handler(request)).root
+    return json.loads(result.content[0].text)
+
+
+@pytest.fixture
+def slow_log(monkeypatch, tmp_path):
+    """Enable tracing with every call logged as slow; yields the log path."""
+    path = tmp_path / "slow.jsonl"
+    monkeypatch.setenv("PROXMOX_MCP_TRACE", "1")
+    monkeypatch.setenv("PROXMOX_MCP_SLOW_MS", "0")
+    monkeypatch.setenv("PROXMOX_MCP_SLOW_LOG", str(path))
+    tracer.configure()
+    tracer.recent.clear()
+    yield path
+    monkeypatch.undo()
+    tracer.configure()
+
+
+def records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_slow_call_is_logged_with_spans(cluster, slow_log):
+    asyncio.run(call("pve_vm_status", {"node": "pve2", "vmid": 101}))
+    [record] = records(slow_log)
+    assert record["tool"] == "pve_vm_status"
+    assert record["requests"] == 1
+    names = [span["name"] for span in record["spans"]]
+    assert names[0] == "arguments"
+    assert {"handler", "request", "format_result"} <= set(names)
+    assert all(span["offset_ms"] >= 0 for span in record["spans"])
+
+    [request] = [span for span in record["spans"] if span["name"] == "request"]
+    assert request["method"] == "GET"
+    assert request["path"] == "/nodes/{node}/qemu/{vmid}/status/current"
+    assert request["status"] == 200
+    assert json.loads(record["spans"][0]["arguments"]) == {"node": "pve2", "vmid": 101}
+    assert tracer.recent[-1]["trace_id"] == record["trace_id"]
+
+
+def test_calls_under_threshold_are_not_logged(cluster, slow_log, monkeypatch):
+    monkeypatch.setenv("PROXMOX_MCP_SLOW_MS", "60000")
+    tracer.configure()
+    asyncio.run(call("pve_vm_status", {"node": "pve2", "vmid": 101}))
+    assert not slow_log.exists() or not slow_log.read_text()
+    assert not tracer.recent
+
+
+def test_errors_are_recorded(cluster, slow_log):
+    asyncio.run(call("pve_vm_status", {"node": "pve1", "vmid": 99999}))
+    [record] = records(slow_log)
+    assert record["error"] == "ResourceException"
+
+
+def test_payload_arguments_are_redacted(cluster, slow_log):
+    arguments = {"node": "pve2", "vmid": 101, "file": "/tmp/key", "content": "s3cret"}
+    asyncio.run(call("pve_agent_file_write", arguments))
+    [record] = records(slow_log)
+    assert "s3cret" not in json.dumps(record)
+    assert json.loads(record["spans"][0]["arguments"])["content"] == "<6 chars>"
+
+
+def test_redact_arguments_only_touches_listed_fields():
+    assert redact_arguments("pve_storage_content", {"content": "iso"}) == {"content": "iso"}
+    assert redact_arguments("pve_agent_exec", {"command": ["id"], "input_data": "x" * 10}) == {
+        "command": ["id"], "input_data": "<10 chars>",
+    }
+
+
+def test_api_wall_time_merges_overlapping_requests():
+    trace = Trace("t")
+    trace.add_span("request", trace.start, 0.1)
+    trace.add_span("request", trace.start + 0.05, 0.1)
+    trace.add_span("request", trace.start + 0.3, 0.1)
+    trace.add_span("handler", trace.start, 1.0)
+    assert trace.api_wall_time() == pytest.approx(0.25)
+
+
+def test_threads_are_registered_while_working(slow_log):
+    trace = tracer.start("t")
+    try:
+        assert not trace.threads
+        with thread_scope(), thread_scope():
+            assert trace.threads == {threading.get_ident(): 2}
+        assert not trace.threads
+
+        def snapshot(_):
+            return threading.get_ident(), dict(trace.threads)
+
+        for _, (ident, threads), _ in map_concurrent(snapshot, range(4), workers=2):
+            assert threads.get(ident) == 1
+        assert not trace.threads
+    finally:
+        tracer.finish(trace)
+
+
+def test_profiler_samples_workers_and_parks_when_idle(slow_log, monkeypatch):
+    monkeypatch.setenv("PROXMOX_MCP_PROFILE", "1")
+    monkeypatch.setenv("PROXMOX_MCP_PROFILE_INTERVAL", "0.002")
+    tracer.configure()
+    with simulate(nodes=2, vms=4, containers=0, latency=0.02):
+        asyncio.run(call("pve_batch_get", {"selector": {}, "kinds": ["status"]}))
+    [record] = records(slow_log)
+    # Only worker threads are sampled, not the event loop waiting in select()
+    assert record["profile"]
+    assert all(stack.startswith("threading.py:_bootstrap") for stack in record["profile"])
+
+    profiler = tracer._profiler._thread
+    deadline = time.monotonic() + 1
+    while time.monotonic() < deadline:
+        frame = sys._current_frames()[profiler.ident]
+        if frame.f_code.co_name == "wait":
+            break
+        time.sleep(0.01)
+    assert frame.f_code.co_name == "wait"